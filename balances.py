@@ -0,0 +1,193 @@
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime
+
+from crawler import get_buff_balance, get_igxe_balance, get_youpin_balance, get_c5_balance
+from driver_pool import driver_pool
+from http_scraper import http_scraper, HttpScrapeError
+from state_store import state_store
+
+logger = logging.getLogger(__name__)
+
+# 使用浏览器获取余额的平台：平台 -> (名称, 获取余额的函数)，登录信息见 driver_pool.PLATFORM_LOGINS
+BROWSER_BALANCE_PLATFORMS = {
+    'buff': ('BUFF', get_buff_balance),
+    'igxe': ('IGXE', get_igxe_balance),
+    'youpin': ('悠悠有品', get_youpin_balance),
+}
+
+# 所有平台，C5使用API获取余额，不需要浏览器
+BALANCE_PLATFORMS = ['c5'] + list(BROWSER_BALANCE_PLATFORMS)
+
+PLATFORM_NAMES = {'c5': 'C5', **{name: entry[0] for name, entry in BROWSER_BALANCE_PLATFORMS.items()}}
+
+# 各平台获取余额的超时时间（秒），包括浏览器池中没有可用浏览器时启动浏览器和加载cookies
+DEFAULT_TIMEOUTS = {'c5': 15, 'buff': 60, 'igxe': 60, 'youpin': 60}
+
+BALANCE_KEYS = [f'{platform}_balance' for platform in ['buff', 'youpin', 'igxe', 'c5']]
+
+def load_balances():
+    """读取余额（保存在 state_store 中，不存在时返回空字典）"""
+    return state_store.get('balance')
+
+
+def save_balances(updated):
+    """
+    将成功获取的余额合并到余额状态并重新计算总余额
+
+    合并在 state_store 的锁内进行，同时进行的其他平台任务写入的余额不会被覆盖，
+    余额文件由 state_store 在后台写入。
+
+    Returns:
+        dict: 合并后的余额数据
+    """
+    def merge(balance_data):
+        balance_data.update(updated)
+        balance_data['total_balance'] = sum(
+            balance for balance in [balance_data.get(key, 0.0) for key in BALANCE_KEYS] if balance is not None
+        )
+        if updated:
+            balance_data['timestamp'] = datetime.now().isoformat()
+
+    return state_store.update('balance', merge)
+
+
+class BrowserSessions:
+    """正在使用的浏览器，超时的平台可以从其他线程关闭浏览器，使阻塞的页面请求立即失败"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._drivers = {}
+        self._abandoned = set()
+
+    def track(self, platform, driver):
+        with self._lock:
+            if platform in self._abandoned:
+                # 等待浏览器期间已超时
+                raise TimeoutError(f"{PLATFORM_NAMES[platform]}余额获取超时")
+            self._drivers[platform] = driver
+
+    def untrack(self, platform):
+        with self._lock:
+            self._drivers.pop(platform, None)
+
+    def abandon(self, platform):
+        """放弃超时的平台并关闭其浏览器（浏览器不会再放回池中）"""
+        with self._lock:
+            self._abandoned.add(platform)
+            driver = self._drivers.pop(platform, None)
+        if driver is not None:
+            driver_pool.invalidate(driver)
+            try:
+                driver.quit()
+            except Exception:
+                pass
+
+
+def fetch_browser_balance(platform, sessions):
+    """从浏览器池借出已登录的浏览器获取余额，获取失败时返回 None"""
+    get_balance = BROWSER_BALANCE_PLATFORMS[platform][1]
+    with driver_pool.lease(platform) as driver:
+        sessions.track(platform, driver)
+        try:
+            balance = get_balance(driver)
+        finally:
+            sessions.untrack(platform)
+        if balance is None:
+            # 可能已退出登录，下次重新启动浏览器并加载cookies
+            driver_pool.invalidate(driver)
+        return balance
+
+
+def fetch_balance(platform, sessions, use_http=False):
+    logger.info("正在更新%s余额...", PLATFORM_NAMES[platform])
+    if platform == 'c5':
+        return get_c5_balance()  # 直接调用API函数
+    if use_http:
+        # 先用保存的cookies直接请求平台接口，失败时再使用浏览器
+        try:
+            return http_scraper.get_balance(platform)
+        except HttpScrapeError as e:
+            logger.warning("通过接口获取%s余额失败，改用浏览器：%s", PLATFORM_NAMES[platform], e)
+    return fetch_browser_balance(platform, sessions)
+
+
+def refresh_balances(platforms=None, timeouts=None, on_result=None, use_http=False):
+    """
+    并发获取各平台余额，每个平台完成后立即合并到余额状态（见 save_balances）
+
+    每个浏览器平台使用独立的浏览器，C5 的API请求同时进行，总耗时约等于最慢的平台。
+    超时或获取失败的平台保持原有余额。
+
+    Args:
+        platforms: 平台列表，默认全部平台
+        timeouts: 平台 -> 超时秒数，未指定的平台使用 DEFAULT_TIMEOUTS
+        on_result: 每个平台结束时的回调 on_result(平台, 余额或None, 错误信息或None)
+        use_http: 浏览器平台是否先通过接口获取余额（见 http_scraper），失败时再使用浏览器
+
+    Returns:
+        dict: 合并后的余额数据，update_status 标记各平台是否更新成功
+    """
+    platforms = list(platforms or BALANCE_PLATFORMS)
+    timeouts = {**DEFAULT_TIMEOUTS, **(timeouts or {})}
+    update_status = {key: False for key in BALANCE_KEYS}
+    errors = {}
+    sessions = BrowserSessions()
+
+    started = time.monotonic()
+    # 超时的平台线程可能仍阻塞在浏览器请求中，不等待其结束
+    executor = ThreadPoolExecutor(max_workers=len(platforms), thread_name_prefix='balance')
+    try:
+        pending = {executor.submit(fetch_balance, platform, sessions, use_http): platform for platform in platforms}
+        deadlines = {platform: started + timeouts[platform] for platform in platforms}
+
+        def finish(platform, balance, error):
+            name = PLATFORM_NAMES[platform]
+            if balance is not None:  # 只有在成功获取余额时才更新
+                save_balances({f'{platform}_balance': balance})
+                update_status[f'{platform}_balance'] = True
+                logger.info("%s余额更新成功: %s（%.2fs）", name, balance, time.monotonic() - started)
+            else:
+                errors[platform] = error or '获取余额失败'
+                logger.warning("%s余额获取失败，保持原有余额: %s", name, errors[platform])
+            if on_result:
+                on_result(platform, balance, error)
+
+        while pending:
+            next_deadline = min(deadlines[platform] for platform in pending.values())
+            done, _ = wait(pending, timeout=max(0, next_deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+            for future in done:
+                platform = pending.pop(future)
+                try:
+                    balance, error = future.result(), None
+                except Exception as e:
+                    balance, error = None, str(e)
+                finish(platform, balance, error)
+
+            now = time.monotonic()
+            for future, platform in list(pending.items()):
+                if now >= deadlines[platform]:
+                    del pending[future]
+                    sessions.abandon(platform)
+                    finish(platform, None, f'超时（{timeouts[platform]}秒）')
+    finally:
+        executor.shutdown(wait=False)
+
+    logger.info("余额更新完成，用时%.2fs", time.monotonic() - started)
+    return balance_result(update_status, errors)
+
+
+def balance_result(update_status=None, errors=None):
+    """
+    余额数据加上各平台的更新状态，格式与 refresh_balances 的返回值相同
+
+    Args:
+        update_status: 余额键 -> 是否更新成功，未指定的平台为 False
+        errors: 平台 -> 错误信息
+    """
+    balance_data = load_balances()
+    balance_data['update_status'] = {**{key: False for key in BALANCE_KEYS}, **(update_status or {})}
+    balance_data['errors'] = dict(errors or {})
+    return balance_data
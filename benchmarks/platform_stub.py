@@ -0,0 +1,177 @@
+"""
+平台接口模拟服务器
+
+按 http_scraper.ENDPOINTS 的路径返回BUFF、IGXE、悠悠有品的余额和库存价值，
+请求未携带登录cookies时返回各平台的未登录响应，可用于在不访问真实平台的情况下检查接口抓取和浏览器回退。
+返回格式与 http_scraper 的解析函数一致，只能检查抓取流程，不能说明真实平台的接口格式。
+
+用法:
+    python benchmarks/platform_stub.py --port 8765
+    # 另一个终端中让应用请求模拟服务器
+    HTTP_SCRAPING=1 SCRAPER_BASE_URL=http://127.0.0.1:8765 python app.py
+    # 启动模拟服务器并用临时cookies测量各接口的请求耗时，解析结果不一致时以状态码1退出
+    python benchmarks/platform_stub.py --check --requests 50
+    # 自动化测试见 tests/test_http_scraper.py
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from http.cookies import SimpleCookie
+from urllib.parse import urlsplit
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from http_scraper import ENDPOINTS, HttpScraper, HttpScrapeError
+
+# 各平台判断已登录的cookie
+LOGIN_COOKIES = {'buff': 'session', 'igxe': 'sessionid', 'youpin': 'uu_token'}
+
+DEFAULT_VALUES = {
+    ('buff', 'balance'): 89.05,
+    ('buff', 'inventory_value'): 12345.6,
+    ('igxe', 'balance'): 338.95,
+    ('youpin', 'balance'): 4409.33,
+}
+
+
+def success_payload(platform, kind, value):
+    """按平台接口格式构造成功响应"""
+    if platform == 'buff':
+        field = 'cash_amount' if kind == 'balance' else 'total_amount'
+        return {'code': 'OK', 'data': {field: f'{value:.2f}'}, 'msg': None}
+    if platform == 'igxe':
+        return {'succ': True, 'data': {'balance': f'￥{value:.2f}'}}
+    return {'Code': 0, 'Msg': '成功', 'Data': {'TotalMoney': value}}
+
+
+def login_required_payload(platform):
+    """按平台接口格式构造未登录响应"""
+    if platform == 'buff':
+        return {'code': 'Login Required', 'error': '请先登录'}
+    if platform == 'igxe':
+        return {'succ': False, 'msg': '请先登录'}
+    return {'Code': 84101, 'Msg': '登录状态失效，请重新登录'}
+
+
+def make_handler(values, latency):
+    routes = {path: (platform, kind) for (platform, kind), (path, _, _) in ENDPOINTS.items()}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            route = routes.get(urlsplit(self.path).path)
+            if route is None:
+                self.send_error(404)
+                return
+            platform, kind = route
+            cookies = SimpleCookie(self.headers.get('Cookie', ''))
+            if LOGIN_COOKIES[platform] in cookies:
+                payload = success_payload(platform, kind, values[route])
+            else:
+                payload = login_required_payload(platform)
+            if latency:
+                time.sleep(latency)
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def start_server(port=0, values=None, latency=0.0):
+    """在后台线程启动模拟服务器，返回服务器（server.server_address 为实际地址）"""
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(values or DEFAULT_VALUES, latency))
+    threading.Thread(target=server.serve_forever, name='platform-stub', daemon=True).start()
+    return server
+
+
+def write_cookie_files(directory):
+    """生成带登录cookie的临时cookies文件，返回 平台 -> 文件路径"""
+    files = {}
+    for platform, name in LOGIN_COOKIES.items():
+        path = os.path.join(directory, f'{platform}_cookies.json')
+        with open(path, 'w') as f:
+            json.dump([{'name': name, 'value': 'stub', 'domain': 'localhost', 'path': '/'}], f)
+        files[platform] = path
+    return files
+
+
+def run_check(request_count, latency):
+    """
+    启动模拟服务器，通过 HttpScraper 请求各接口并输出耗时
+
+    Returns:
+        list: 检查失败的说明（解析出的数值与服务器返回的不一致，或未登录时没有报错），全部通过时为空
+    """
+    server = start_server(latency=latency)
+    failures = []
+    base_url = f'http://127.0.0.1:{server.server_address[1]}'
+    with tempfile.TemporaryDirectory(prefix='cs2profit-stub-') as directory:
+        scraper = HttpScraper(base_url, write_cookie_files(directory))
+        print(f"{'接口':<24}{'结果':>12}{'首次':>10}{'中位数':>10}")
+        for platform, kind in ENDPOINTS:
+            timings = []
+            for _ in range(request_count):
+                started = time.perf_counter()
+                value = scraper.fetch(platform, kind)
+                timings.append(time.perf_counter() - started)
+            if abs(value - DEFAULT_VALUES[(platform, kind)]) > 0.005:
+                failures.append(f"{platform}/{kind} 解析结果 {value} 与返回的 {DEFAULT_VALUES[(platform, kind)]} 不一致")
+            warm = sorted(timings[1:] or timings)
+            print(f"{platform + '/' + kind:<24}{value:>12.2f}{timings[0] * 1000:>8.1f}ms"
+                  f"{warm[len(warm) // 2] * 1000:>8.1f}ms")
+
+        # 缺少登录cookie时应返回未登录错误
+        expired = os.path.join(directory, 'expired_cookies.json')
+        with open(expired, 'w') as f:
+            json.dump([{'name': 'other', 'value': 'stub'}], f)
+        anonymous = HttpScraper(base_url, {platform: expired for platform in LOGIN_COOKIES})
+        for platform in LOGIN_COOKIES:
+            try:
+                anonymous.get_balance(platform)
+            except HttpScrapeError as e:
+                print(f"{platform} 未登录时: {e}")
+            else:
+                failures.append(f"{platform} 未登录时没有抛出 HttpScrapeError")
+        anonymous.close()
+        scraper.close()
+    server.shutdown()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description='平台接口模拟服务器')
+    parser.add_argument('--port', type=int, default=8765, help='监听端口')
+    parser.add_argument('--latency', type=float, default=0.0, help='每个响应前的延迟（秒），模拟网络耗时')
+    parser.add_argument('--check', action='store_true', help='启动后用临时cookies请求各接口并输出耗时，然后退出')
+    parser.add_argument('--requests', type=int, default=20, help='--check 时每个接口的请求次数')
+    args = parser.parse_args()
+
+    if args.check:
+        failures = run_check(args.requests, args.latency)
+        for failure in failures:
+            print(f"检查失败: {failure}")
+        sys.exit(1 if failures else 0)
+
+    server = start_server(args.port, latency=args.latency)
+    print(f"模拟服务器已启动: http://127.0.0.1:{server.server_address[1]}（Ctrl+C 退出）")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
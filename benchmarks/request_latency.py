@@ -0,0 +1,137 @@
+"""
+/api/data 请求延迟基准测试
+
+每种日志配置在独立的临时目录和子进程中运行（复制代码、页面资源和数据目录，
+不会修改仓库中的数据库），记录导入应用耗时、后台导入完成耗时、首次请求耗时和之后请求的中位数/P95。
+日志输出写入临时文件，以计入实际的格式化和写入开销。
+
+用法:
+    python benchmarks/request_latency.py
+    python benchmarks/request_latency.py --requests 50 --data-dir /path/to/data
+    # 与改用日志之前的版本对比（先用 git worktree 检出旧版本）
+    python benchmarks/request_latency.py --repo /tmp/cs2profit-old --label before
+"""
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 默认对比的日志配置：名称 -> 环境变量
+LOG_CONFIGS = {
+    'info': {'LOG_LEVEL': 'INFO'},
+    'debug-sampled': {'LOG_LEVEL': 'DEBUG'},
+    'debug-every-row': {'LOG_LEVEL': 'DEBUG', 'LOG_SAMPLE_EVERY': '1'},
+}
+
+CHILD_SCRIPT = r'''
+import sys, json, time
+result_path, request_count = sys.argv[1], int(sys.argv[2])
+start = time.perf_counter()
+import app as app_module
+import_seconds = time.perf_counter() - start
+client = app_module.app.test_client()
+# 启动导入在后台进行时，等待导入完成后再计时
+ingestion = getattr(app_module, 'ingestion', None)
+ready_seconds = 0.0
+if ingestion is not None:
+    start = time.perf_counter()
+    client.get('/api/ready')
+    ingestion.wait()
+    ready_seconds = time.perf_counter() - start
+timings = []
+for _ in range(request_count):
+    start = time.perf_counter()
+    response = client.get('/api/data')
+    timings.append(time.perf_counter() - start)
+    if response.status_code != 200:
+        raise SystemExit(f"/api/data 返回 {response.status_code}")
+with open(result_path, 'w') as f:
+    json.dump({'import_seconds': import_seconds, 'ready_seconds': ready_seconds, 'timings': timings}, f)
+'''
+
+
+def prepare_workdir(repo_dir, data_dir, workdir):
+    """复制代码、页面资源和数据目录到临时目录"""
+    for name in os.listdir(repo_dir):
+        if name.endswith('.py'):
+            shutil.copy2(os.path.join(repo_dir, name), workdir)
+    for name in ['templates', 'static']:
+        source = os.path.join(repo_dir, name)
+        if os.path.isdir(source):
+            shutil.copytree(source, os.path.join(workdir, name))
+    shutil.copytree(data_dir, os.path.join(workdir, 'data'))
+
+
+def percentile(values, ratio):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * ratio))]
+
+
+def run_config(repo_dir, data_dir, env_overrides, request_count):
+    """在独立子进程中运行一种配置，返回耗时统计（秒）"""
+    with tempfile.TemporaryDirectory(prefix='cs2profit-bench-') as workdir:
+        prepare_workdir(repo_dir, data_dir, workdir)
+        result_path = os.path.join(workdir, 'result.json')
+        log_path = os.path.join(workdir, 'output.log')
+        env = dict(os.environ, **env_overrides)
+        env.pop('LOG_LEVELS', None)
+        with open(log_path, 'w') as log_file:
+            subprocess.run(
+                [sys.executable, '-c', CHILD_SCRIPT, result_path, str(request_count)],
+                cwd=workdir, env=env, stdout=log_file, stderr=log_file, check=True
+            )
+        with open(result_path) as f:
+            result = json.load(f)
+        with open(log_path, 'rb') as f:
+            log_lines = sum(1 for _ in f)
+
+    timings = result['timings']
+    warm = timings[1:] or timings
+    return {
+        'import_seconds': round(result['import_seconds'], 4),
+        'ready_seconds': round(result['ready_seconds'], 4),
+        'first_request_seconds': round(timings[0], 4),
+        'median_seconds': round(percentile(warm, 0.5), 4),
+        'p95_seconds': round(percentile(warm, 0.95), 4),
+        'output_lines': log_lines
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='/api/data 请求延迟基准测试')
+    parser.add_argument('--repo', default=REPO_DIR, help='被测代码目录，默认为当前仓库')
+    parser.add_argument('--data-dir', help='交易数据目录，默认为被测代码目录下的 data')
+    parser.add_argument('--requests', type=int, default=20, help='每种配置的请求次数')
+    parser.add_argument('--config', action='append', choices=sorted(LOG_CONFIGS),
+                        help='只运行指定的日志配置，可重复')
+    parser.add_argument('--label', help='只运行一次（不设置日志环境变量）并以此名称输出，用于测试旧版本')
+    parser.add_argument('--output', help='将结果以JSON格式保存到该文件')
+    args = parser.parse_args()
+
+    repo_dir = os.path.abspath(args.repo)
+    data_dir = os.path.abspath(args.data_dir or os.path.join(repo_dir, 'data'))
+    if args.label:
+        configs = {args.label: {}}
+    else:
+        configs = {name: LOG_CONFIGS[name] for name in (args.config or LOG_CONFIGS)}
+
+    results = {}
+    print(f"{'配置':<18}{'导入':>10}{'就绪':>10}{'首次请求':>10}{'中位数':>10}{'P95':>10}{'输出行数':>10}")
+    for name, env_overrides in configs.items():
+        stats = run_config(repo_dir, data_dir, env_overrides, args.requests)
+        results[name] = stats
+        print(f"{name:<18}{stats['import_seconds']:>10.4f}{stats['ready_seconds']:>10.4f}{stats['first_request_seconds']:>10.4f}"
+              f"{stats['median_seconds']:>10.4f}{stats['p95_seconds']:>10.4f}{stats['output_lines']:>10}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
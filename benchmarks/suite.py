@@ -0,0 +1,198 @@
+"""
+端到端基准测试
+
+对每个数据量生成（或复用）合成交易数据，在临时SQLite数据库中依次计时：
+    load_csv      各平台适配器解析全部导出文件并生成明细行
+    ingest        sync_trade_records 将导出文件同步到数据库
+    merge         MergeState.apply 商品归并与批次匹配（首次全量）
+    aggregates    summary.build_summary 计算汇总值并展开持有、成交记录，即 /api/data 响应内容的生成
+    serialize     按 /api/data 的响应结构序列化为JSON
+    noop_refresh  数据未变化时一次请求的同步与合并开销
+结果保存为JSON，可用 --baseline 与之前版本的结果对比。
+
+用法:
+    python benchmarks/suite.py --sizes 1000 10000
+    python benchmarks/suite.py --baseline benchmarks/results/old.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+from datetime import datetime
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+import pandas as pd
+from flask import Flask
+from models import db, init_sqlite_pragmas
+from ingest import iter_trade_files, build_record_rows, sync_trade_records
+from csv_adapters import get_adapter
+from merge_state import MergeState
+from state_store import StateStore
+from summary import build_summary
+from log_config import configure_logging
+from synthetic_trades import DEFAULT_SIZES, write_dataset
+
+STAGES = ['load_csv', 'ingest', 'merge', 'aggregates', 'serialize', 'noop_refresh']
+
+DEFAULT_RESULTS_DIR = os.path.join(REPO_DIR, 'benchmarks', 'results')
+
+
+def git_revision():
+    """当前代码的提交号，无法获取时返回 None"""
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                                capture_output=True, text=True, check=True)
+        return result.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def ensure_dataset(data_root, rows, seed):
+    """返回数据集目录，不存在时生成"""
+    dataset_dir = os.path.join(data_root, str(rows))
+    if not os.path.isdir(dataset_dir):
+        started = time.perf_counter()
+        write_dataset(rows, dataset_dir, seed)
+        print(f"已生成 {rows} 行数据集，用时 {time.perf_counter() - started:.2f}s")
+    return dataset_dir
+
+
+def create_app(database_path):
+    app = Flask('benchmark')
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{database_path}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    init_sqlite_pragmas(app)
+    return app
+
+
+def run_size(dataset_dir, policy):
+    """对一份数据集运行各阶段，返回耗时（秒）和结果规模"""
+    timings = {}
+    workdir = tempfile.mkdtemp(prefix='cs2profit-suite-')
+    try:
+        app = create_app(os.path.join(workdir, 'bench.db'))
+        with app.app_context():
+            db.create_all()
+
+            started = time.perf_counter()
+            record_count = 0
+            for platform_dir, file_path, is_buy in iter_trade_files(dataset_dir):
+                frame = get_adapter(platform_dir).load(file_path)
+                record_count += len(build_record_rows(platform_dir, file_path, is_buy, frame))
+            timings['load_csv'] = time.perf_counter() - started
+
+            started = time.perf_counter()
+            sync_trade_records(dataset_dir)
+            timings['ingest'] = time.perf_counter() - started
+
+            merge_state = MergeState(policy=policy)
+            started = time.perf_counter()
+            merge_state.apply()
+            timings['merge'] = time.perf_counter() - started
+
+            # 余额、库存价值和总投入使用临时目录中不存在的文件（均为空）
+            state = StateStore({
+                name: os.path.join(workdir, f'{name}.json') for name in ['balance', 'inventory_value', 'total_investment']
+            }).snapshot()
+            started = time.perf_counter()
+            lots = merge_state.snapshot()
+            payload = build_summary(lots, state)
+            payload['holdings'] = lots['holdings']
+            payload['completed_trades'] = lots['completed_trades']
+            timings['aggregates'] = time.perf_counter() - started
+
+            started = time.perf_counter()
+            body = app.json.dumps(payload)
+            timings['serialize'] = time.perf_counter() - started
+
+            started = time.perf_counter()
+            removed_keys = sync_trade_records(dataset_dir)
+            merge_state.apply(removed_keys, policy=policy)
+            timings['noop_refresh'] = time.perf_counter() - started
+
+            db.session.remove()
+            db.engine.dispose()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        'records': record_count,
+        'items': len(merge_state.items),
+        'holdings': len(lots['holdings']),
+        'completed_trades': len(lots['completed_trades']),
+        'response_bytes': len(body.encode('utf-8')),
+        'timings': {stage: round(timings[stage], 4) for stage in STAGES}
+    }
+
+
+def print_results(results, baseline=None):
+    header = f"{'行数':>10}" + ''.join(f"{stage:>14}" for stage in STAGES)
+    print(header)
+    for rows, result in results.items():
+        line = f"{rows:>10}"
+        for stage in STAGES:
+            seconds = result['timings'][stage]
+            cell = f"{seconds:.4f}"
+            previous = (baseline or {}).get(rows, {}).get('timings', {}).get(stage)
+            if previous:
+                cell += f"({(seconds / previous - 1) * 100:+.0f}%)"
+            line += f"{cell:>14}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='端到端基准测试')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='数据集的交易总行数')
+    parser.add_argument('--data-root', default=os.path.join(tempfile.gettempdir(), 'cs2profit-synthetic'),
+                        help='合成数据集目录，已存在的数据集直接复用')
+    parser.add_argument('--seed', type=int, default=0, help='生成数据集的随机种子')
+    parser.add_argument('--policy', default='fifo', help='批次匹配策略')
+    parser.add_argument('--output', help='结果JSON路径，默认保存到 benchmarks/results/')
+    parser.add_argument('--baseline', help='之前保存的结果JSON，用于对比')
+    args = parser.parse_args()
+
+    configure_logging('WARNING')
+
+    results = {}
+    for rows in args.sizes:
+        dataset_dir = ensure_dataset(args.data_root, rows, args.seed)
+        results[str(rows)] = run_size(dataset_dir, args.policy)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+    print_results(results, baseline)
+
+    revision = git_revision()
+    report = {
+        'revision': revision,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'machine': platform.platform(),
+        'seed': args.seed,
+        'policy': args.policy,
+        'results': results
+    }
+    output = args.output
+    if not output:
+        os.makedirs(DEFAULT_RESULTS_DIR, exist_ok=True)
+        filename = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{revision or 'unknown'}.json"
+        output = os.path.join(DEFAULT_RESULTS_DIR, filename)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"结果已保存到 {output}")
+
+
+if __name__ == '__main__':
+    main()
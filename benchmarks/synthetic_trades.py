@@ -0,0 +1,253 @@
+"""
+合成交易数据生成器
+
+按各平台真实导出文件的格式生成买入和卖出CSV（BUFF、悠悠有品、IGXE、C5），
+同一饰品在不同平台使用各自的命名格式（全角/半角括号、有无空格），
+并包含同一皮肤的不同磨损等级和StatTrak™版本，用于检验商品归并和批次匹配。
+价格和日期由 crawler.generate_random_price / generate_random_date 生成。
+
+用法:
+    python benchmarks/synthetic_trades.py --rows 1000 10000 --output-dir /tmp/cs2profit-synthetic
+    # 生成的 /tmp/cs2profit-synthetic/1000 可直接作为 data 目录使用
+"""
+import os
+import sys
+import csv
+import random
+import argparse
+from datetime import datetime, timedelta
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from crawler import generate_random_price, generate_random_date
+
+# 默认生成的数据量（交易记录总行数）
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+
+# 交易时间范围
+START_DATE = '2020-05-03'
+END_DATE = '2025-05-03'
+
+WEAR_LEVELS = ['崭新出厂', '略有磨损', '久经沙场', '破损不堪', '战痕累累']
+
+# 武器 -> 基础价格
+WEAPONS = {
+    'AK-47': 120, 'M4A1 消音型': 150, 'M4A4': 110, 'AWP': 260, '沙漠之鹰': 60,
+    'USP 消音版': 45, '格洛克 18 型': 35, 'P250': 12, 'FN57': 18, 'MP9': 15,
+    'MAC-10': 14, 'UMP-45': 10, 'P90': 20, 'SSG 08': 30, '法玛斯': 16,
+    '加利尔 AR': 15, 'SG 553': 18, 'AUG': 22, '新星': 8, 'XM1014': 9,
+}
+
+# 刀具和手套 -> 基础价格，名称带（★）
+KNIVES = {
+    '蝴蝶刀': 9000, '爪子刀': 6500, '穿肠刀': 1200, '鲍伊猎刀': 1800, '折叠刀': 1500,
+    '摩托手套': 2600, '运动手套': 5200, '驾驶手套': 1900,
+}
+
+SKINS = [
+    '红线', '血腥运动', '二西莫夫', '火蛇', '暴怒野兽', '荒野公主', '霓虹骑士', '深红之网',
+    '人工染色', '伽马多普勒', '渐变之色', '黑色层压板', '森林 DDPAT', '都市伪装', '怪兽在B',
+    '美洲猛虎', '皇后', '海之泡沫', '致命紫罗兰', '精英之作', '沙漠风暴', '蓝图', '翡翠',
+    '嘣！', '碰！', '潜行者', '破晓', '野火', '夜愿', '印花集',
+]
+
+STICKERS = ['敬礼！', '八号球', '猛虎', '黄金之星', '牛仔', '摇滚', '梦想', '闪耀之心']
+
+# 平台目录 -> (交易占比, 导出文件名前缀)
+PLATFORMS = {
+    'buff': (0.45, 'synthetic'),
+    'youyou': (0.3, 'youyou'),
+    'igxe': (0.15, 'igxe'),
+    'c5': (0.1, 'c5'),
+}
+
+# 买入后在导出范围内卖出的概率
+SALE_PROBABILITY = 0.45
+
+# 悠悠有品导出中使用 YYYY.MM.DDHH:MM:SS 格式的比例
+YOUPIN_DOTTED_DATE_RATIO = 0.1
+
+
+def build_catalog(size, rng):
+    """
+    生成饰品目录
+
+    Returns:
+        list: 饰品字典（weapon, skin, wear, stattrak, knife, base_price, goods_id）
+    """
+    catalog = []
+    seen = set()
+    attempts = 0
+    while len(catalog) < size and attempts < size * 20:
+        attempts += 1
+        roll = rng.random()
+        if roll < 0.1:
+            item = {'weapon': '印花', 'skin': rng.choice(STICKERS), 'wear': None,
+                    'stattrak': False, 'knife': False, 'base_price': rng.uniform(0.3, 40)}
+        else:
+            knife = roll > 0.85
+            weapon = rng.choice(list(KNIVES if knife else WEAPONS))
+            base_price = (KNIVES if knife else WEAPONS)[weapon]
+            wear = rng.choice(WEAR_LEVELS)
+            stattrak = rng.random() < 0.2
+            item = {'weapon': weapon, 'skin': rng.choice(SKINS), 'wear': wear,
+                    'stattrak': stattrak, 'knife': knife,
+                    'base_price': base_price * rng.uniform(0.5, 3) * (1.5 if stattrak else 1)
+                    * (1 + 0.2 * (len(WEAR_LEVELS) - WEAR_LEVELS.index(wear)))}
+        key = (item['weapon'], item['skin'], item['wear'], item['stattrak'])
+        if key in seen:
+            continue
+        seen.add(key)
+        item['goods_id'] = 30000 + len(catalog)
+        catalog.append(item)
+    return catalog
+
+
+def weapon_label(item):
+    """武器名称，刀具带（★），StatTrak™版本带后缀"""
+    label = item['weapon']
+    if item['knife']:
+        label += '（★）'
+    if item['stattrak']:
+        label += '（StatTrak™）'
+    return label
+
+
+def format_name(item, platform):
+    """按平台的命名习惯格式化饰品名称"""
+    if platform == 'youyou':
+        # 悠悠有品：无空格，磨损等级使用全角括号
+        name = f"{weapon_label(item)}|{item['skin']}"
+        return f"{name}（{item['wear']}）" if item['wear'] else name
+    name = f"{weapon_label(item)} | {item['skin']}"
+    return f"{name} ({item['wear']})" if item['wear'] else name
+
+
+def random_time(date_str, rng, not_before=None):
+    """在指定日期内生成随机时间，可限定不早于某个时间"""
+    moment = datetime.strptime(date_str, '%Y-%m-%d') + timedelta(seconds=rng.randint(0, 86399))
+    if not_before and moment < not_before:
+        moment = not_before + timedelta(seconds=rng.randint(1, 3600))
+    return moment
+
+
+def format_time(moment, platform, rng):
+    if platform == 'youyou' and rng.random() < YOUPIN_DOTTED_DATE_RATIO:
+        return moment.strftime('%Y.%m.%d%H:%M:%S')
+    return moment.strftime('%Y-%m-%d %H:%M:%S')
+
+
+def pick_platform(rng):
+    roll = rng.random()
+    for platform, (share, _) in PLATFORMS.items():
+        if roll < share:
+            return platform
+        roll -= share
+    return platform
+
+
+def generate_trades(rows, seed=0):
+    """
+    生成交易记录
+
+    每次买入后按 SALE_PROBABILITY 在之后的日期、可能是另一个平台卖出，
+    热门饰品出现的次数更多（按排名倒数加权），直到总行数达到 rows。
+
+    Returns:
+        dict: (平台目录名, 'buy'/'sale') -> 交易列表 [(饰品, 价格, 时间)]
+    """
+    # generate_random_price / generate_random_date 使用全局 random，需要同时设置种子
+    random.seed(seed)
+    rng = random.Random(seed)
+    catalog = build_catalog(min(5000, max(50, rows // 20)), rng)
+    weights = [1 / (rank + 1) for rank in range(len(catalog))]
+
+    trades = {(platform, kind): [] for platform in PLATFORMS for kind in ('buy', 'sale')}
+    count = 0
+    batch = 1024
+    while count < rows:
+        for item in rng.choices(catalog, weights=weights, k=batch):
+            buy_platform = pick_platform(rng)
+            buy_date = generate_random_date(START_DATE, END_DATE)
+            buy_time = random_time(buy_date, rng)
+            buy_price = generate_random_price(item['base_price'])
+            trades[(buy_platform, 'buy')].append((item, buy_price, buy_time))
+            count += 1
+            if count >= rows:
+                break
+
+            if rng.random() < SALE_PROBABILITY:
+                sale_platform = pick_platform(rng)
+                sale_date = generate_random_date(buy_date, END_DATE)
+                sale_time = random_time(sale_date, rng, not_before=buy_time)
+                sale_price = generate_random_price(item['base_price'], 0.9, 1.3)
+                trades[(sale_platform, 'sale')].append((item, sale_price, sale_time))
+                count += 1
+                if count >= rows:
+                    break
+    return trades
+
+
+def write_platform_file(path, platform, trades, rng):
+    """按平台导出格式写入CSV"""
+    if platform == 'buff':
+        with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['游戏', '饰品', '价格', '时间', '状态'])
+            for item, price, moment in trades:
+                url = (f"https://buff.163.com/goods/{item['goods_id']}?appid=730&game=csgo"
+                       f"&assetid={rng.randint(10 ** 10, 10 ** 11)}&contextid=2")
+                writer.writerow(['csgo', f'=HYPERLINK("{url}", "{format_name(item, platform)}")',
+                                 f'¥ {price}', format_time(moment, platform, rng), '交易成功'])
+    elif platform == 'youyou':
+        with open(path, 'w', encoding='utf-8-sig', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['饰品', '价格', '磨损', '时间'])
+            for item, price, moment in trades:
+                float_value = rng.random() if item['wear'] else ''
+                writer.writerow([format_name(item, platform), price, float_value,
+                                 format_time(moment, platform, rng)])
+    else:
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['name', 'price', 'time'])
+            for item, price, moment in trades:
+                writer.writerow([format_name(item, platform), price, format_time(moment, platform, rng)])
+
+
+def write_dataset(rows, output_dir, seed=0):
+    """
+    生成一份数据集，目录结构与 data 目录一致（output_dir/<平台>/<前缀>_buy.csv）
+
+    Returns:
+        dict: 各文件路径 -> 行数
+    """
+    trades = generate_trades(rows, seed)
+    rng = random.Random(seed + 1)
+    written = {}
+    for (platform, kind), platform_trades in trades.items():
+        platform_dir = os.path.join(output_dir, platform)
+        os.makedirs(platform_dir, exist_ok=True)
+        path = os.path.join(platform_dir, f"{PLATFORMS[platform][1]}_{kind}.csv")
+        write_platform_file(path, platform, platform_trades, rng)
+        written[path] = len(platform_trades)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成合成交易数据')
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_SIZES, help='每份数据集的交易总行数')
+    parser.add_argument('--output-dir', default='synthetic_data', help='输出目录，每份数据集位于以行数命名的子目录')
+    parser.add_argument('--seed', type=int, default=0, help='随机种子')
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        dataset_dir = os.path.join(args.output_dir, str(rows))
+        written = write_dataset(rows, dataset_dir, args.seed)
+        print(f"已生成 {dataset_dir}：{sum(written.values())} 条交易记录，{len(written)} 个文件")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+import os
+import json
+import time
+import random
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+BASE_URL = "http://openapi.c5game.com"
+
+API_KEY_PATH = "data/cookie/c5_api_key.json"
+
+# 连接和读取超时（秒）
+DEFAULT_TIMEOUT = (3.05, 15)
+
+# 调用频率限制：平均每秒请求数和允许的突发请求数，保持在C5开放平台的调用频率限制以内
+DEFAULT_RATE = 5.0
+DEFAULT_BURST = 5
+
+# 重试：连接失败、超时、429和5xx响应最多重试的次数，等待时间按指数增长并加入随机抖动
+DEFAULT_MAX_RETRIES = 4
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class C5ApiError(Exception):
+    """C5 API请求失败或返回 success=false"""
+
+
+class TokenBucket:
+    """令牌桶限流，rate 为每秒补充的令牌数，capacity 为桶容量（允许的突发请求数）"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        取出一个令牌，令牌不足时等待
+
+        Returns:
+            float: 等待的秒数
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+def backoff_delay(attempt: int, base: float = BACKOFF_BASE, cap: float = BACKOFF_MAX) -> float:
+    """第 attempt 次重试前的等待时间：在 [0, min(cap, base * 2^attempt)] 内随机（full jitter）"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class C5Client:
+    """
+    C5开放平台API客户端
+
+    所有C5 API请求都通过该客户端：复用 requests.Session 的连接池（keep-alive），
+    按令牌桶限流，连接失败、超时、429和5xx响应按带抖动的指数退避重试。
+    API密钥读取后缓存在内存中，密钥文件修改后自动重新读取。
+    """
+
+    def __init__(self, api_key_path: str = API_KEY_PATH, base_url: str = BASE_URL,
+                 timeout: Tuple[float, float] = DEFAULT_TIMEOUT, max_retries: int = DEFAULT_MAX_RETRIES,
+                 rate: float = DEFAULT_RATE, burst: int = DEFAULT_BURST, pool_size: int = 8):
+        self.api_key_path = api_key_path
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.pool_size = pool_size
+        self.bucket = TokenBucket(rate, burst)
+        self._lock = threading.Lock()
+        self._session = None
+        self._api_key = None
+        self._api_key_mtime = None
+
+    @property
+    def api_key(self) -> str:
+        """API密钥（缓存，密钥文件修改后重新读取）"""
+        try:
+            mtime = os.path.getmtime(self.api_key_path)
+        except OSError as e:
+            raise C5ApiError(f"加载API密钥失败: {e}")
+        with self._lock:
+            if self._api_key is None or mtime != self._api_key_mtime:
+                try:
+                    with open(self.api_key_path, 'r', encoding='utf-8') as f:
+                        api_key = json.load(f).get('app_key')
+                except Exception as e:
+                    raise C5ApiError(f"加载API密钥失败: {e}")
+                if not api_key:
+                    raise C5ApiError("API key不能为空")
+                self._api_key = api_key
+                self._api_key_mtime = mtime
+            return self._api_key
+
+    @property
+    def session(self):
+        """共享的 requests.Session，首次使用时创建"""
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        with self._lock:
+            if self._session is None:
+                session = requests.Session()
+                # 重试由 request() 处理，连接池按并发数设置
+                adapter = HTTPAdapter(pool_connections=2, pool_maxsize=self.pool_size, max_retries=0)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._session = session
+            return self._session
+
+    def request(self, method: str, path: str, params: Optional[Dict] = None, json_body: Optional[Dict] = None) -> Dict:
+        """
+        发送请求并返回响应JSON
+
+        Args:
+            method: HTTP方法
+            path: 接口路径，如 /merchant/account/v1/balance
+            params: 查询参数（app-key 自动添加）
+            json_body: JSON请求体
+
+        Returns:
+            Dict: 响应JSON（success 为 true，数据在 data 字段中）
+
+        Raises:
+            C5ApiError: 重试后仍失败，或接口返回 success=false
+        """
+        import requests
+
+        api_key = self.api_key
+        url = f"{self.base_url}{path}"
+        params = {**(params or {}), 'app-key': api_key}
+        headers = {'app-key': api_key}
+
+        attempt = 0
+        while True:
+            self.bucket.acquire()
+            retry_after = None
+            try:
+                response = self.session.request(method, url, params=params, json=json_body,
+                                                headers=headers, timeout=self.timeout)
+                if response.status_code not in RETRY_STATUS:
+                    response.raise_for_status()
+                    payload = response.json()
+                    if not payload.get('success'):
+                        raise C5ApiError(payload.get('errorMsg') or f"errorCode {payload.get('errorCode')}")
+                    return payload
+                error = f"HTTP {response.status_code}"
+                retry_after = response.headers.get('Retry-After')
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = str(e)
+            except (requests.RequestException, ValueError) as e:
+                raise C5ApiError(f"请求{path}失败: {e}") from e
+
+            if attempt >= self.max_retries:
+                raise C5ApiError(f"请求{path}失败（已重试{attempt}次）: {error}")
+            delay = backoff_delay(attempt)
+            if retry_after and retry_after.isdigit():
+                delay = max(delay, float(retry_after))
+            attempt += 1
+            logger.warning("请求%s失败: %s，%.2fs后第%d次重试", path, error, delay, attempt)
+            time.sleep(delay)
+
+    def get(self, path: str, params: Optional[Dict] = None) -> Dict:
+        return self.request('GET', path, params=params)
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+
+c5_client = C5Client()
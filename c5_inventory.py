@@ -1,14 +1,32 @@
+import os
+import csv
 import json
-import requests
-import pandas as pd
-from typing import Dict, Optional, List
+import logging
+import threading
+from typing import Dict, Optional, List, Iterable, Iterator, Tuple
 from pathlib import Path
 from datetime import datetime
+from log_config import configure_logging
+from c5_client import C5Client, C5ApiError, c5_client, API_KEY_PATH
+
+logger = logging.getLogger(__name__)
+
+# 库存CSV的列：物品名称和 itemInfo 中的分类信息
+INVENTORY_CSV_FIELDS = ['name', 'shortName', 'qualityName', 'rarityName', 'typeName', 'weaponName',
+                        'exteriorName', 'itemSetName', 'customPlayerName', 'stickerCapsuleName', 'patchCapsuleName']
+
+def extract_item_row(item: Dict) -> Dict:
+    """提取库存物品写入CSV的字段"""
+    item_info = item.get('itemInfo') or {}
+    row = {'name': item.get('name', ''), 'shortName': item.get('shortName', '')}
+    for field in INVENTORY_CSV_FIELDS[2:]:
+        row[field] = item_info.get(field, '')
+    return row
 
 class C5Inventory:
     """C5 API库存查询类"""
     
-    def __init__(self, api_key_path: str = "data/cookie/c5_api_key.json", steam_id_path: str = "data/cookie/steam_id.json"):
+    def __init__(self, api_key_path: str = API_KEY_PATH, steam_id_path: str = "data/cookie/steam_id.json"):
         """
         初始化C5库存查询类
         
@@ -16,27 +34,10 @@ class C5Inventory:
             api_key_path: API密钥文件路径
             steam_id_path: Steam ID配置文件路径
         """
-        self.base_url = "http://openapi.c5game.com"
-        self.api_key = self._load_api_key(api_key_path)
+        # 默认密钥文件使用共享的客户端（连接池、限流和密钥缓存）
+        self.client = c5_client if api_key_path == API_KEY_PATH else C5Client(api_key_path)
         self.steam_id = self._load_steam_id(steam_id_path)
         
-    def _load_api_key(self, api_key_path: str) -> str:
-        """
-        从文件加载API密钥
-        
-        Args:
-            api_key_path: API密钥文件路径
-            
-        Returns:
-            str: API密钥
-        """
-        try:
-            with open(api_key_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return data.get('app_key')
-        except Exception as e:
-            raise Exception(f"加载API密钥失败: {str(e)}")
-            
     def _load_steam_id(self, steam_id_path: str) -> str:
         """
         从文件加载Steam ID
@@ -68,29 +69,59 @@ class C5Inventory:
         Returns:
             Dict: 库存数据
         """
-        url = f"{self.base_url}/merchant/inventory/v2/{self.steam_id}/{app_id}"
-        
         # 构建查询参数
         params = {
             "language": language,
-            "startAssetId": start_asset_id,
-            "app-key": self.api_key
+            "startAssetId": start_asset_id
         }
         if count:
             params["count"] = count
-            
-        # 设置请求头
-        headers = {
-            'app-key': self.api_key
-        }
         
         try:
-            response = requests.get(url, headers=headers, params=params)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
+            return self.client.get(f"/merchant/inventory/v2/{self.steam_id}/{app_id}", params)
+        except C5ApiError as e:
             raise Exception(f"获取库存失败: {str(e)}")
             
+    def iter_inventory_pages(self, app_id: str = "730", language: str = "zh",
+                             count: Optional[str] = None, start_asset_id: str = "0") -> Iterator[List[Dict]]:
+        """
+        分页获取全部Steam库存，每次返回一页物品
+        
+        从 start_asset_id 开始，按上一页返回的 lastAssetId 请求下一页，
+        直到返回空页、没有 lastAssetId 或 lastAssetId 不再变化。
+        
+        Args:
+            app_id: 游戏ID (CS2: 730, Dota2: 570)
+            language: 语言 (zh: 中文, en: 英文)
+            count: 每页条数，不传时使用接口默认值
+            start_asset_id: 开始assetId
+            
+        Yields:
+            List[Dict]: 一页库存物品
+        """
+        seen = {str(start_asset_id)}
+        page = 0
+        while True:
+            inventory = self.get_inventory(app_id, language, start_asset_id, count)
+            data = inventory.get('data') or {}
+            items = data.get('list') or []
+            page += 1
+            logger.debug("库存第%d页：%d件物品，lastAssetId=%s", page, len(items), data.get('lastAssetId'))
+            if not items:
+                return
+            yield items
+            
+            last_asset_id = data.get('lastAssetId')
+            if not last_asset_id or str(last_asset_id) in seen:
+                return
+            seen.add(str(last_asset_id))
+            start_asset_id = str(last_asset_id)
+            
+    def iter_inventory_items(self, app_id: str = "730", language: str = "zh", count: Optional[str] = None) -> Iterator[Dict]:
+        """逐件返回全部Steam库存物品（按页请求，不在内存中保留全部库存）"""
+        for items in self.iter_inventory_pages(app_id, language, count):
+            yield from items
+            
     def save_inventory_to_file(self, inventory: Dict, steam_id: str) -> str:
         """
         将库存信息保存到JSON文件
@@ -133,49 +164,129 @@ class C5Inventory:
         if 'data' in inventory and 'list' in inventory['data']:
             items = inventory['data']['list']
         
-        # 提取指定字段
-        extracted_data = []
-        for item in items:
-            item_info = item.get('itemInfo', {})
-            item_data = {
-                'name': item.get('name', ''),
-                'shortName': item.get('shortName', ''),
-                'qualityName': item_info.get('qualityName', ''),
-                'rarityName': item_info.get('rarityName', ''),
-                'typeName': item_info.get('typeName', ''),
-                'weaponName': item_info.get('weaponName', ''),
-                'exteriorName': item_info.get('exteriorName', ''),
-                'itemSetName': item_info.get('itemSetName', ''),
-                'customPlayerName': item_info.get('customPlayerName', ''),
-                'stickerCapsuleName': item_info.get('stickerCapsuleName', ''),
-                'patchCapsuleName': item_info.get('patchCapsuleName', '')
-            }
-            extracted_data.append(item_data)
+        return self.save_items_to_csv(items, output_file)[0]
+    
+    def save_items_to_csv(self, items: Iterable[Dict], output_file: str = "data/steaminventory.csv") -> Tuple[str, int]:
+        """
+        将库存物品逐行写入CSV文件
+        
+        物品可以来自 iter_inventory_items() 等生成器，边请求边写入，内存占用与库存大小无关。
+        先写临时文件再替换，读取库存的请求不会读到写了一半的文件；请求中途失败时保留原文件。
         
-        # 转换为DataFrame并保存为CSV
-        df = pd.DataFrame(extracted_data)
-        df.to_csv(output_file, index=False, encoding='utf-8-sig')  # 使用utf-8-sig以支持Excel正确显示中文
+        Args:
+            items: 库存物品
+            output_file: 输出文件名
+            
+        Returns:
+            Tuple[str, int]: 保存的文件路径和物品数量
+        """
+        temp_file = f"{output_file}.tmp"
+        count = 0
+        try:
+            # 使用utf-8-sig以支持Excel正确显示中文
+            with open(temp_file, 'w', encoding='utf-8-sig', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=INVENTORY_CSV_FIELDS)
+                writer.writeheader()
+                for item in items:
+                    writer.writerow(extract_item_row(item))
+                    count += 1
+        except BaseException:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            raise
+        os.replace(temp_file, output_file)
         
-        return output_file
+        return output_file, count
+
+def refresh_inventory():
+    """从C5 API分页获取全部库存并逐页写入CSV文件，失败时抛出异常"""
+    # 初始化C5库存查询类
+    c5 = C5Inventory()
+    
+    # 逐页获取库存并写入CSV文件
+    csv_filepath, count = c5.save_items_to_csv(c5.iter_inventory_items())
+    logger.info("库存信息已保存到CSV文件: %s，共%d件物品", csv_filepath, count)
+    return csv_filepath
 
 def update_inventory():
     """更新库存数据"""
     try:
-        # 初始化C5库存查询类
-        c5 = C5Inventory()
-        
-        # 获取库存
-        inventory = c5.get_inventory()
-        
-        # 保存到CSV文件
-        csv_filepath = c5.save_inventory_to_csv(inventory)
-        print(f"库存信息已保存到CSV文件: {csv_filepath}")
-        
+        refresh_inventory()
         return True
         
     except Exception as e:
-        print(f"错误: {str(e)}")
+        logger.error("错误: %s", e)
         return False
 
+class InventoryRefresher:
+    """
+    库存后台刷新
+    
+    请求只读取已保存的库存文件，不等待网络。数据超过 ttl 秒未刷新时，
+    在后台线程中刷新一次（同一时间最多一个），刷新完成前继续返回旧数据。
+    刷新失败时保留旧数据并记录错误，等到下一个 ttl 周期再重试。
+    """
+    
+    def __init__(self, ttl: float = 600, csv_path: str = "data/steaminventory.csv", refresh=refresh_inventory):
+        self.ttl = ttl
+        self.csv_path = csv_path
+        self._refresh = refresh
+        self._lock = threading.Lock()
+        self.refreshing = False
+        self.last_attempt_at = None
+        self.last_error = None
+        # 以已有库存文件的修改时间作为上次刷新时间，重启后不必立即刷新
+        try:
+            self.last_refresh_at = datetime.fromtimestamp(os.path.getmtime(csv_path))
+        except OSError:
+            self.last_refresh_at = None
+    
+    def is_stale(self, now: Optional[datetime] = None) -> bool:
+        """数据是否需要刷新（从未刷新过，或距上次刷新/尝试已超过 ttl）"""
+        now = now or datetime.now()
+        last = max(filter(None, [self.last_refresh_at, self.last_attempt_at]), default=None)
+        return last is None or (now - last).total_seconds() >= self.ttl
+    
+    def maybe_refresh(self) -> bool:
+        """
+        数据过期时启动后台刷新，立即返回
+        
+        Returns:
+            bool: 本次调用是否启动了刷新
+        """
+        with self._lock:
+            if self.refreshing or not self.is_stale():
+                return False
+            self.refreshing = True
+            self.last_attempt_at = datetime.now()
+        threading.Thread(target=self._run, name='inventory-refresh', daemon=True).start()
+        return True
+    
+    def _run(self):
+        try:
+            self._refresh()
+            with self._lock:
+                self.last_refresh_at = datetime.now()
+                self.last_error = None
+        except Exception as e:
+            logger.error("后台刷新库存失败: %s", e)
+            with self._lock:
+                self.last_error = str(e)
+        finally:
+            with self._lock:
+                self.refreshing = False
+    
+    def status(self) -> Dict:
+        """刷新状态，随库存数据一起返回给页面"""
+        with self._lock:
+            return {
+                'last_refresh_at': self.last_refresh_at.isoformat(timespec='seconds') if self.last_refresh_at else None,
+                'last_attempt_at': self.last_attempt_at.isoformat(timespec='seconds') if self.last_attempt_at else None,
+                'refreshing': self.refreshing,
+                'error': self.last_error,
+                'ttl': self.ttl
+            }
+
 if __name__ == "__main__":
+    configure_logging()
     update_inventory() 
\ No newline at end of file
@@ -1,38 +1,135 @@
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.service import Service
-from models import db, Trade
+from models import db, Trade, TradeRecord, assign_trade_keys, TRADE_IDENTITY, BUFF_TRADE_IDENTITY
+from ingest import sync_trade_records
+from state_store import state_store
 import time
-from datetime import datetime
-import pandas as pd
+from datetime import datetime, timedelta
 import os
-import sqlite3
 import random
 import re
-import csv
 import json
-import sys
-import requests
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# 轻量模式下通过CDP的 Network.setBlockedURLs 屏蔽的资源（图片、音视频和字体），页面中需要读取的数据都是文本
+BLOCKED_RESOURCE_PATTERNS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico',
+    '*.mp4', '*.webm', '*.m3u8', '*.mp3', '*.m4a', '*.ogg',
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+]
+
+def get_chrome_driver(headless=False):
+    """
+    获取配置好的Chrome浏览器实例
+
+    Args:
+        headless: 使用无头的轻量模式：DOM加载完成即返回（eager），不加载图片、音视频和字体。
+            浏览器池中长期运行的浏览器使用该模式，保存cookies等需要手动登录的场景不使用
+    """
+    # 本模块的 Selenium 都在函数内导入，只在实际爬取时加载，Web进程启动时不需要
+    from selenium import webdriver
 
-def get_chrome_driver():
-    """获取配置好的Chrome浏览器实例"""
     options = webdriver.ChromeOptions()
     options.add_argument('--no-sandbox')
-    # options.add_argument('--headless')  # 暂时注释掉无头模式，方便调试
+    if headless:
+        options.add_argument('--headless=new')
+        options.add_argument('--disable-gpu')
+        options.add_argument('--disable-extensions')
+        options.add_argument('--mute-audio')
+        options.add_argument('--window-size=1280,800')
+        options.add_experimental_option('prefs', {
+            'profile.managed_default_content_settings.images': 2,
+        })
+        # driver.get() 在DOM加载完成后返回，不等待图片等资源，需要的元素用 wait_for_text 等待
+        options.page_load_strategy = 'eager'
     
     try:
         driver = webdriver.Chrome(options=options)
-        return driver
     except Exception as e:
-        print(f"初始化Chrome浏览器失败：{str(e)}")
-        print("请确保：")
-        print("1. Chrome浏览器已安装")
-        print("2. ChromeDriver版本与Chrome浏览器版本匹配")
-        print("3. ChromeDriver文件未被损坏")
+        logger.error("初始化Chrome浏览器失败：%s", e)
+        logger.error("请确保：")
+        logger.error("1. Chrome浏览器已安装")
+        logger.error("2. ChromeDriver版本与Chrome浏览器版本匹配")
+        logger.error("3. ChromeDriver文件未被损坏")
         raise
 
+    if headless:
+        try:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_RESOURCE_PATTERNS})
+        except Exception as e:
+            logger.warning("设置资源屏蔽失败，将加载全部资源：%s", e)
+    return driver
+
+class WaitTimings:
+    """记录各等待步骤的耗时，用于查看每个页面实际需要等待多久"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._steps = {}
+
+    def record(self, step, seconds, timed_out=False):
+        with self._lock:
+            stats = self._steps.setdefault(step, {'count': 0, 'timeouts': 0, 'total': 0.0, 'max': 0.0, 'last': 0.0})
+            stats['count'] += 1
+            stats['timeouts'] += timed_out
+            stats['total'] += seconds
+            stats['max'] = max(stats['max'], seconds)
+            stats['last'] = seconds
+
+    def summary(self):
+        """各步骤的等待次数、超时次数和平均/最长/最近一次耗时（秒）"""
+        with self._lock:
+            return {
+                step: {
+                    'count': stats['count'],
+                    'timeouts': stats['timeouts'],
+                    'avg': round(stats['total'] / stats['count'], 3),
+                    'max': round(stats['max'], 3),
+                    'last': round(stats['last'], 3)
+                }
+                for step, stats in self._steps.items()
+            }
+
+wait_timings = WaitTimings()
+
+def wait_for_text(driver, locator, step, timeout=10):
+    """
+    等待元素出现且文本不为空（数值由页面脚本填充），记录等待耗时
+
+    Args:
+        locator: (By.xxx, 选择器)
+        step: 等待步骤名称，用于记录耗时
+
+    Returns:
+        WebElement: 找到的元素
+
+    Raises:
+        TimeoutException: 超时仍未出现
+    """
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.common.exceptions import TimeoutException, StaleElementReferenceException
+
+    def element_with_text(driver):
+        elements = driver.find_elements(*locator)
+        if elements and elements[0].text.strip():
+            return elements[0]
+        return False
+
+    started = time.perf_counter()
+    try:
+        element = WebDriverWait(driver, timeout, poll_frequency=0.1,
+                                ignored_exceptions=(StaleElementReferenceException,)).until(element_with_text)
+    except TimeoutException:
+        wait_timings.record(step, time.perf_counter() - started, timed_out=True)
+        logger.warning("%s：等待%s秒后仍未找到元素", step, timeout)
+        raise
+    elapsed = time.perf_counter() - started
+    wait_timings.record(step, elapsed)
+    logger.debug("%s：等待%.2fs", step, elapsed)
+    return element
+
 def generate_random_price(base_price, min_ratio=0.8, max_ratio=1.2):
     """生成随机价格"""
     return round(base_price * random.uniform(min_ratio, max_ratio), 2)
@@ -43,7 +140,7 @@ def generate_random_date(start_date, end_date):
     end = datetime.strptime(end_date, '%Y-%m-%d')
     delta = end - start
     random_days = random.randint(0, delta.days)
-    return (start + pd.Timedelta(days=random_days)).strftime('%Y-%m-%d')
+    return (start + timedelta(days=random_days)).strftime('%Y-%m-%d')
 
 def clean_item_name(name):
     """清理物品名称，移除超链接和特殊字符"""
@@ -64,164 +161,160 @@ def clean_price(price):
 def update_buff_trades():
     """更新BUFF交易记录"""
     try:
-        # 读取购买记录
+        # 从导入的交易明细中汇总BUFF买入和卖出记录
         buy_records = {}
-        buy_file_path = 'data/buff/U1101693104_20200503_20250503_buy.csv'
-        if os.path.exists(buy_file_path):
-            with open(buy_file_path, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    # 获取基础物品名称（移除颜色信息）
-                    base_name = clean_item_name(row['饰品']).split(' (')[0]
-                    price = clean_price(row['价格'])
-                    trade_date = datetime.strptime(row['时间'], '%Y-%m-%d %H:%M:%S')
-                    
-                    if base_name not in buy_records:
-                        buy_records[base_name] = {
-                            'quantity': 1,
-                            'total_price': price,
-                            'trade_date': trade_date
-                        }
-                    else:
-                        buy_records[base_name]['quantity'] += 1
-                        buy_records[base_name]['total_price'] += price
-                        # 更新为最早的交易日期
-                        if trade_date < buy_records[base_name]['trade_date']:
-                            buy_records[base_name]['trade_date'] = trade_date
-
-        # 读取卖出记录
         sell_records = {}
-        sell_file_path = 'data/buff/U1101693104_20200503_20250503_sale.csv'
-        if os.path.exists(sell_file_path):
-            with open(sell_file_path, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    # 获取基础物品名称（移除颜色信息）
-                    base_name = clean_item_name(row['饰品']).split(' (')[0]
-                    price = clean_price(row['价格'])
-                    trade_date = datetime.strptime(row['时间'], '%Y-%m-%d %H:%M:%S')
-                    
-                    if base_name not in sell_records:
-                        sell_records[base_name] = {
-                            'quantity': 1,
-                            'total_price': price,
-                            'trade_date': trade_date
-                        }
-                    else:
-                        sell_records[base_name]['quantity'] += 1
-                        sell_records[base_name]['total_price'] += price
-                        # 更新为最早的交易日期
-                        if trade_date < sell_records[base_name]['trade_date']:
-                            sell_records[base_name]['trade_date'] = trade_date
-
-        # 将BUFF交易记录整合到现有交易记录中
-        for base_name, record in buy_records.items():
-            # 计算平均单价
-            avg_price = record['total_price'] / record['quantity']
+        for trade_record in TradeRecord.query.filter_by(platform='BUFF').order_by(TradeRecord.id).all():
+            # 获取基础物品名称（移除颜色信息）
+            base_name = trade_record.item_name.split(' (')[0]
+            price = trade_record.price
+            trade_date = datetime.strptime(trade_record.trade_time, '%Y-%m-%d %H:%M:%S')
+            records = buy_records if trade_record.type == 'buy' else sell_records
             
-            # 查找是否已存在相同物品的交易记录
-            existing_trade = Trade.query.filter_by(item_name=base_name).first()
-            if existing_trade:
-                # 更新现有记录
-                existing_trade.quantity = record['quantity']
-                existing_trade.unit_price = avg_price
-                existing_trade.total_price = record['total_price']
-                existing_trade.purchase_date = record['trade_date'].date()
-                existing_trade.platform = 'BUFF'
-                existing_trade.type = 'buy'
+            if base_name not in records:
+                records[base_name] = {
+                    'quantity': 1,
+                    'total_price': price,
+                    'trade_date': trade_date
+                }
             else:
-                # 创建新记录
-                new_trade = Trade(
-                    item_name=base_name,
-                    quantity=record['quantity'],
-                    unit_price=avg_price,
-                    total_price=record['total_price'],
-                    purchase_date=record['trade_date'].date(),
-                    platform='BUFF',
-                    type='buy'
-                )
-                db.session.add(new_trade)
+                records[base_name]['quantity'] += 1
+                records[base_name]['total_price'] += price
+                # 更新为最早的交易日期
+                if trade_date < records[base_name]['trade_date']:
+                    records[base_name]['trade_date'] = trade_date
 
-        for base_name, record in sell_records.items():
-            # 计算平均单价
-            avg_price = record['total_price'] / record['quantity']
-            
-            # 查找是否已存在相同物品的交易记录
-            existing_trade = Trade.query.filter_by(item_name=base_name).first()
-            if existing_trade:
-                # 更新现有记录
-                existing_trade.sale_price = avg_price
-                existing_trade.sale_date = record['trade_date'].date()
-                existing_trade.platform = 'BUFF'
-                existing_trade.type = 'sale'
-            else:
-                # 创建新记录
-                new_trade = Trade(
-                    item_name=base_name,
-                    quantity=record['quantity'],
-                    unit_price=avg_price,
-                    total_price=record['total_price'],
-                    sale_price=avg_price,
-                    sale_date=record['trade_date'].date(),
-                    platform='BUFF',
-                    type='sale'
-                )
-                db.session.add(new_trade)
+        # 将BUFF交易记录整合到现有交易记录中：按交易标识（平台和物品）批量插入或更新，整个过程只有一次提交
+        buy_rows = [
+            {
+                'item_name': base_name,
+                'quantity': record['quantity'],
+                'unit_price': record['total_price'] / record['quantity'],  # 平均单价
+                'total_price': record['total_price'],
+                'purchase_date': record['trade_date'].date(),
+                'platform': 'BUFF',
+                'type': 'buy'
+            }
+            for base_name, record in buy_records.items()
+        ]
+        assign_trade_keys(buy_rows, BUFF_TRADE_IDENTITY)
+        upsert_trades(buy_rows, ['quantity', 'unit_price', 'total_price', 'purchase_date', 'platform', 'type'])
+
+        sell_rows = [
+            {
+                'item_name': base_name,
+                'quantity': record['quantity'],
+                'unit_price': record['total_price'] / record['quantity'],
+                'total_price': record['total_price'],
+                'sale_price': record['total_price'] / record['quantity'],
+                'sale_date': record['trade_date'].date(),
+                'platform': 'BUFF',
+                'type': 'sale'
+            }
+            for base_name, record in sell_records.items()
+        ]
+        assign_trade_keys(sell_rows, BUFF_TRADE_IDENTITY)
+        # 已有记录只更新卖出信息
+        upsert_trades(sell_rows, ['sale_price', 'sale_date', 'platform', 'type'])
 
         db.session.commit()
-        print(f"成功更新BUFF交易记录：{len(buy_records)}条买入记录，{len(sell_records)}条卖出记录")
+        logger.info("成功更新BUFF交易记录：%s条买入记录，%s条卖出记录", len(buy_records), len(sell_records))
     except Exception as e:
         db.session.rollback()
-        print(f"更新BUFF交易记录失败：{str(e)}")
+        logger.error("更新BUFF交易记录失败：%s", e)
         raise
 
+def upsert_trades(rows, update_columns):
+    """
+    批量写入交易记录：trade_key 不存在时插入，已存在时只更新 update_columns 中的列
+
+    行需要先通过 models.assign_trade_keys 计算 trade_key。使用 SQLite 的 INSERT ... ON CONFLICT DO UPDATE，所有行通过一次 executemany 写入，
+    不提交事务，由调用方统一提交
+    """
+    from sqlalchemy.dialects.sqlite import insert
+
+    if not rows:
+        return
+    statement = insert(Trade)
+    statement = statement.on_conflict_do_update(
+        index_elements=[Trade.trade_key],
+        set_={column: statement.excluded[column] for column in update_columns}
+    )
+    db.session.execute(statement, rows)
+
 def update_trades():
     """更新交易记录"""
+    import pandas as pd
+
     try:
         # 确保data目录存在
         os.makedirs('data', exist_ok=True)
         
-        # 清空现有交易记录
-        Trade.query.delete()
-        
-        # 读取CSV文件
+        # 读取CSV文件，缺少的可选列按空值处理
         df = pd.read_csv('data/trades.csv')
-        
-        # 处理每一行数据
-        for _, row in df.iterrows():
-            trade = Trade(
-                item_name=row['item_name'],
-                quantity=row['quantity'],
-                unit_price=row['unit_price'],
-                total_price=row['total_price'],
-                current_price=row['current_price'] if pd.notna(row['current_price']) else None,
-                purchase_date=pd.to_datetime(row['purchase_date']).date() if pd.notna(row['purchase_date']) else None,
-                sale_date=pd.to_datetime(row['sale_date']).date() if pd.notna(row['sale_date']) else None,
-                sale_price=row['sale_price'] if pd.notna(row['sale_price']) else None,
-                platform='CSV',
-                type='buy' if pd.notna(row['purchase_date']) else 'sale'
+        df = df.reindex(columns=df.columns.union(['current_price', 'purchase_date', 'sale_date', 'sale_price'], sort=False))
+        purchase_dates = pd.to_datetime(df['purchase_date'])
+        sale_dates = pd.to_datetime(df['sale_date'])
+        # 转换为Python类型，空值转换为None
+        df = df.astype(object).where(df.notna(), None)
+
+        rows = [
+            {
+                'item_name': item_name,
+                'quantity': int(quantity),
+                'unit_price': float(unit_price),
+                'total_price': float(total_price),
+                'current_price': current_price,
+                'purchase_date': purchase_date.date() if pd.notna(purchase_date) else None,
+                'sale_date': sale_date.date() if pd.notna(sale_date) else None,
+                'sale_price': sale_price,
+                'platform': 'CSV',
+                'type': 'buy' if pd.notna(purchase_date) else 'sale'
+            }
+            for item_name, quantity, unit_price, total_price, current_price, purchase_date, sale_date, sale_price in zip(
+                df['item_name'].tolist(), df['quantity'].tolist(), df['unit_price'].tolist(),
+                df['total_price'].tolist(), df['current_price'].tolist(), purchase_dates.tolist(),
+                sale_dates.tolist(), df['sale_price'].tolist()
             )
-            db.session.add(trade)
+        ]
+
+        # 完全相同的行按出现顺序得到不同的 trade_key，都会保留
+        assign_trade_keys(rows, TRADE_IDENTITY)
+
+        # 清空现有交易记录后批量写入，与提交在同一个事务中
+        Trade.query.delete()
+        upsert_trades(rows, ['quantity', 'unit_price', 'total_price', 'current_price', 'purchase_date',
+                             'sale_date', 'sale_price', 'platform', 'type'])
         
         # 提交更改
         db.session.commit()
-        print("交易记录更新成功")
+        logger.info("交易记录更新成功：%s条", len(rows))
         
     except Exception as e:
-        print(f"更新交易记录时出错: {str(e)}")
+        logger.error("更新交易记录时出错: %s", e)
         db.session.rollback()
         raise
 
 def update_all_trades():
-    """更新所有交易记录"""
+    """
+    更新所有交易记录
+
+    Returns:
+        set: 同步导出文件时被移除的明细所属的商品键，见 sync_trade_records
+    """
+    # 先将各平台导出文件同步到交易明细表
+    removed_keys = sync_trade_records()
     update_trades()
     update_buff_trades()
+    return removed_keys
 
 def update_trades_selenium():
     """
     更新交易记录
     注意：这是一个框架函数，需要根据具体网站进行修改
     """
+    from selenium import webdriver
+
     # 初始化浏览器
     driver = webdriver.Chrome()
     
@@ -230,7 +323,7 @@ def update_trades_selenium():
         
         
     except Exception as e:
-        print(f"爬取过程中出现错误: {str(e)}")
+        logger.error("爬取过程中出现错误: %s", e)
         raise
     finally:
         driver.quit()
@@ -293,208 +386,97 @@ def save_buff_cookies():
         except:
             pass
 
-def get_inventory_value():
-    """获取BUFF库存价值"""
+def save_inventory_value(value):
+    """保存库存价值（state_store，后台写入文件），并更新数据库中的库存价值"""
+    # 保存到状态存储，文件在后台写入
+    state_store.set('inventory_value', {
+        'value': value,
+        'timestamp': datetime.now().isoformat(),
+        'last_update': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'is_manual_update': True  # 添加标志，表示这是手动更新的值
+    })
+
+    # 更新数据库中的库存价值
     try:
-        # 使用新的get_chrome_driver函数初始化浏览器
-        driver = get_chrome_driver()
-        
-        # 尝试加载cookies
+        # 所有交易记录的当前价格设为库存价值的平均值，用一条 UPDATE 语句完成；
+        # 盈亏和盈亏比例不保存，读取时由 current_price 和 unit_price 计算（见 Trade.net_profit / Trade.profit_ratio）
+        trade_count = db.select(db.func.count()).select_from(Trade).scalar_subquery()
+        result = db.session.execute(db.update(Trade).values(current_price=value / trade_count))
+        db.session.commit()
+        logger.info("数据库更新成功：%s条交易记录", result.rowcount)
+    except Exception as e:
+        logger.error("更新数据库失败：%s", e)
+        db.session.rollback()
+
+def get_inventory_value(use_http=False):
+    """
+    获取BUFF库存价值
+
+    Args:
+        use_http: 先用保存的cookies直接请求BUFF接口，失败时再使用浏览器
+    """
+    if use_http:
+        from http_scraper import http_scraper, HttpScrapeError
+
         try:
-            if os.path.exists('data/cookie/buff_cookies.json'):
-                print("正在加载cookies...")
-                driver.get("https://buff.163.com/")
-                with open('data/cookie/buff_cookies.json', 'r') as f:
-                    cookies = json.load(f)
-                    # 如果cookies是字符串格式，转换为对象列表
-                    if isinstance(cookies, str):
-                        cookies = parse_cookie_string(cookies)
-                    # 验证cookies
-                    if not verify_cookies(cookies):
-                        raise Exception("Cookies无效或已过期")
-                    # 添加cookies
-                    for cookie in cookies:
-                        driver.add_cookie(cookie)
-                print("Cookies加载成功")
-                
-                # 刷新页面使cookies生效
-                print("刷新页面使cookies生效...")
-                driver.refresh()
-                time.sleep(1)  # 等待页面刷新完成
-            else:
-                print("未找到cookies文件，请先运行 save_cookies() 保存登录信息")
-                raise Exception("未找到cookies文件")
-        except Exception as e:
-            print(f"加载cookies失败：{str(e)}")
-            raise
-        
-        print("正在访问BUFF库存页面...")
-        driver.get("https://buff.163.com/market/steam_inventory?game=csgo#page_num=1&page_size=50&fold=false&search=&steamid=76561198333752402&state=all")
-        
-        # 等待页面加载
-        print("等待页面加载...")
-        time.sleep(1)  # 增加等待时间
+            value = http_scraper.get_inventory_value()
+            logger.info("通过接口获取BUFF库存价值：%s", value)
+            save_inventory_value(value)
+            return value
+        except HttpScrapeError as e:
+            logger.warning("通过接口获取库存价值失败，改用浏览器：%s", e)
+
+    from selenium.webdriver.common.by import By
+    from driver_pool import driver_pool
+
+    try:
+        # 从浏览器池借出已加载BUFF cookies的浏览器，出错时浏览器会被回收
+        with driver_pool.lease('buff') as driver:
+            logger.info("正在访问BUFF库存页面...")
+            driver.get("https://buff.163.com/market/steam_inventory?game=csgo#page_num=1&page_size=50&fold=false&search=&steamid=76561198333752402&state=all")
         
-        try:
-            # 等待估值元素出现，使用更精确的选择器
-            print("等待估值元素...")
-            value_element = WebDriverWait(driver, 20).until(  # 增加等待时间
-                EC.presence_of_element_located((By.CSS_SELECTOR, ".l_Right.export-btns.brief-info strong.c_Yellow.f_Normal:nth-child(2)"))
-            )
+            try:
+                # 等待估值元素出现并填充数值，使用更精确的选择器
+                logger.info("等待估值元素...")
+                value_element = wait_for_text(
+                    driver, (By.CSS_SELECTOR, ".l_Right.export-btns.brief-info strong.c_Yellow.f_Normal:nth-child(2)"),
+                    'BUFF库存估值', timeout=20
+                )
             
-            # 获取估值文本
-            value_text = value_element.text
-            print(f"获取到估值文本：{value_text}")
+                # 获取估值文本
+                value_text = value_element.text
+                logger.debug("获取到估值文本：%s", value_text)
             
-            # 提取数字部分
-            value = float(value_text.replace('¥', '').strip())
+                # 提取数字部分
+                value = float(value_text.replace('¥', '').strip())
             
-            # 保存到文件
-            os.makedirs('data', exist_ok=True)
-            with open('data/inventory_value.json', 'w') as f:
-                json.dump({
-                    'value': value,
-                    'timestamp': datetime.now().isoformat(),
-                    'last_update': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                    'is_manual_update': True  # 添加标志，表示这是手动更新的值
-                }, f)
+                save_inventory_value(value)
+                return value
             
-            # 更新数据库中的库存价值
-            try:
-                from models import db, Trade
-                # 更新所有交易记录的当前价格
-                trades = Trade.query.all()
-                if len(trades) > 0:
-                    avg_price = value / len(trades)
-                    for trade in trades:
-                        trade.current_price = avg_price
-                        trade.net_profit = trade.current_price - trade.unit_price
-                        trade.profit_ratio = (trade.current_price - trade.unit_price) / trade.unit_price if trade.unit_price > 0 else 0
-                    db.session.commit()
-                    print("数据库更新成功")
             except Exception as e:
-                print(f"更新数据库失败：{str(e)}")
-                db.session.rollback()
-            
-            return value
-            
-        except Exception as e:
-            print(f"获取估值元素失败：{str(e)}")
-            # 如果获取失败，尝试读取上次保存的值
-            try:
-                if os.path.exists('data/inventory_value.json'):
-                    with open('data/inventory_value.json', 'r') as f:
-                        data = json.load(f)
-                        print(f"使用上次保存的值：{data['value']}")
-                        return data['value']
-            except Exception as e:
-                print(f"读取上次保存的值失败：{str(e)}")
-            raise
-            
+                logger.error("获取估值元素失败：%s", e)
+                # 可能已退出登录，归还时关闭浏览器，下次重新加载cookies
+                driver_pool.invalidate(driver)
+                # 如果获取失败，尝试读取上次保存的值
+                saved_value = state_store.get('inventory_value').get('value')
+                if saved_value is not None:
+                    logger.info("使用上次保存的值：%s", saved_value)
+                    return saved_value
+                raise
+
     except Exception as e:
-        print(f"获取库存价值失败: {str(e)}")
+        logger.error("获取库存价值失败: %s", e)
         raise
-    finally:
-        try:
-            driver.quit()
-        except:
-            pass 
 
 def get_total_balance():
-    """获取所有平台的账户余额"""
-    try:
-        driver = get_chrome_driver()
-        
-        # 加载BUFF cookies
-        if os.path.exists('data/cookie/buff_cookies.json'):
-            driver.get("https://buff.163.com/")
-            with open('data/cookie/buff_cookies.json', 'r') as f:
-                cookies = json.load(f)
-                if isinstance(cookies, str):
-                    cookies = parse_cookie_string(cookies)
-                if not verify_cookies(cookies):
-                    raise Exception("BUFF Cookies无效或已过期")
-                for cookie in cookies:
-                    driver.add_cookie(cookie)
-            driver.refresh()
-            time.sleep(1)
-        
-        # 获取BUFF余额
-        buff_balance = get_buff_balance(driver)
-        
-        # 加载IGXE cookies
-        if os.path.exists('data/cookie/igxe_cookies.json'):
-            driver.get("https://www.igxe.cn/")
-            with open('data/cookie/igxe_cookies.json', 'r') as f:
-                cookies = json.load(f)
-                if isinstance(cookies, str):
-                    cookies = parse_cookie_string(cookies)
-                for cookie in cookies:
-                    driver.add_cookie(cookie)
-            driver.refresh()
-            time.sleep(1)
-        
-        # 获取IGXE余额
-        igxe_balance = get_igxe_balance(driver)
-
-        # youyou cookies
-        if os.path.exists('data/cookie/youpin_cookies.json'):
-            driver.get("https://www.youpin898.com/")
-            with open('data/cookie/youpin_cookies.json', 'r') as f:
-                cookies = json.load(f)
-                if isinstance(cookies, str):
-                    cookies = parse_cookie_string(cookies)
-                for cookie in cookies:
-                    driver.add_cookie(cookie)
-            driver.refresh()
-            time.sleep(1)
-        # 悠悠有品余额
-        youpin_balance = get_youpin_balance(driver)
-        
-        # 获取C5余额
-        if os.path.exists('data/cookie/c5_cookies.json'):
-            driver.get("https://www.c5game.com/csgo")
-            with open('data/cookie/c5_cookies.json', 'r') as f:
-                cookies = json.load(f)
-                if isinstance(cookies, str):
-                    cookies = parse_cookie_string(cookies)
-                for cookie in cookies:
-                    driver.add_cookie(cookie)
-            driver.refresh()
-            time.sleep(1)
-        c5_balance = get_c5_balance()
-        
-        # 计算总余额
-        total_balance = buff_balance + igxe_balance + youpin_balance + c5_balance
-        
-        # 保存余额数据
-        balance_data = {
-            'buff_balance': buff_balance,
-            'igxe_balance': igxe_balance,
-            'youpin_balance': youpin_balance,
-            'c5_balance': c5_balance,
-            'total_balance': total_balance,
-            'timestamp': datetime.now().isoformat()
-        }
-        
-        with open('data/balance.json', 'w', encoding='utf-8') as f:
-            json.dump(balance_data, f, ensure_ascii=False, indent=4)
-        
-        print(f"余额获取完成 - BUFF: {buff_balance}, IGXE: {igxe_balance}, 悠悠有品: {youpin_balance}, C5: {c5_balance}, 总计: {total_balance}")
-        return balance_data
-        
-    except Exception as e:
-        print(f"获取余额失败: {str(e)}")
-        return {
-            'buff_balance': None,
-            'igxe_balance': None,
-            'youpin_balance': None,
-            'c5_balance': None,
-            'total_balance': None,
-            'timestamp': datetime.now().isoformat()
-        }
-    finally:
-        driver.quit() 
+    """获取所有平台的账户余额（各平台并发获取，见 balances.refresh_balances）"""
+    from balances import refresh_balances
+
+    balance_data = refresh_balances()
+    logger.info("余额获取完成 - BUFF: %s, IGXE: %s, 悠悠有品: %s, C5: %s, 总计: %s",
+                balance_data.get('buff_balance'), balance_data.get('igxe_balance'),
+                balance_data.get('youpin_balance'), balance_data.get('c5_balance'), balance_data.get('total_balance'))
+    return balance_data
 
 def save_igxe_cookies():
     """保存IGXE登录cookies"""
@@ -549,122 +531,78 @@ def save_youpin_cookies():
 
 def get_c5_balance():
     """获取C5账户余额（使用API）"""
+    from c5_client import c5_client, C5ApiError
+
     try:
-        # 读取API key
-        try:
-            with open('data/cookie/c5_api_key.json', 'r') as f:
-                api_config = json.load(f)
-                APP_KEY = api_config.get('app_key')
-                if not APP_KEY:
-                    raise ValueError("API key不能为空")
-        except Exception as e:
-            print(f"读取C5 API key失败: {str(e)}")
-            return None
-        
-        # API配置
-        BASE_URL = "http://openapi.c5game.com"
-        
-        # 构建请求URL和头部
-        endpoint = "/merchant/account/v1/balance"
-        url = f"{BASE_URL}{endpoint}"
-        
-        # 设置请求参数和头部
-        params = {
-            "app-key": APP_KEY,
-            "accountType": 0  # 0-账户余额
-        }
-        
-        headers = {
-            "app-key": APP_KEY
-        }
-        
-        # 发送请求
-        response = requests.get(url, params=params, headers=headers)
-        
-        # 检查响应状态码
-        if response.status_code == 200:
-            data = response.json()
-            
-            # 检查API响应是否成功
-            if data.get("success"):
-                balance_info = data.get("data", {})
-                balance = balance_info.get("balance", 0.0)
-                print(f"成功获取C5余额: {balance}")
-                return balance
-            else:
-                print(f"获取C5余额失败: {data.get('errorMsg')}")
-                return None
-        else:
-            print(f"获取C5余额失败: HTTP {response.status_code}")
-            return None
-            
-    except Exception as e:
-        print(f"获取C5余额失败: {str(e)}")
+        response = c5_client.get("/merchant/account/v1/balance", {"accountType": 0})  # 0-账户余额
+        balance_info = response.get("data") or {}
+        balance = balance_info.get("balance", 0.0)
+        logger.info("成功获取C5余额: %s", balance)
+        return balance
+    except C5ApiError as e:
+        logger.error("获取C5余额失败: %s", e)
         return None
 
 def get_buff_balance(driver):
     """获取BUFF账户余额"""
+    from selenium.webdriver.common.by import By
+
     try:
         # 访问BUFF余额页面
         driver.get('https://buff.163.com/user-center/asset/recharge/')
-        time.sleep(3)  # 等待页面加载
         
-        # 等待余额元素出现
-        balance_element = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.ID, "cash_amount"))
-        )
+        # 等待余额元素出现并填充数值
+        balance_element = wait_for_text(driver, (By.ID, "cash_amount"), 'BUFF余额')
         
         # 提取余额数值
         balance_text = balance_element.text.replace('¥', '').strip()
         balance = float(balance_text)
         
-        print(f"成功获取BUFF余额：¥{balance:.2f}")
+        logger.info("成功获取BUFF余额：¥%.2f", balance)
         return balance
         
     except Exception as e:
-        print(f"获取BUFF余额失败：{str(e)}")
+        logger.error("获取BUFF余额失败：%s", e)
         return None
 
 def get_youpin_balance(driver):
     """获取悠悠有品余额"""
+    from selenium.webdriver.common.by import By
+
     try:
         # 访问悠悠有品钱包页面
         driver.get("https://www.youpin898.com/mine?menu=wallet")
-        time.sleep(2)  # 等待页面加载
         
-        # 等待余额元素出现
-        balance_element = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, "div.total____0lXK span:nth-child(2)"))
-        )
+        # 等待余额元素出现并填充数值
+        balance_element = wait_for_text(driver, (By.CSS_SELECTOR, "div.total____0lXK span:nth-child(2)"), '悠悠有品余额')
         
         # 获取余额值
         balance = float(balance_element.text)
-        print(f"成功获取悠悠有品余额: {balance}")
+        logger.info("成功获取悠悠有品余额: %s", balance)
         
         return balance
     except Exception as e:
-        print(f"获取悠悠有品余额失败: {str(e)}")
+        logger.error("获取悠悠有品余额失败: %s", e)
         return None
 
 def get_igxe_balance(driver):
     """获取IGXE账户余额"""
+    from selenium.webdriver.common.by import By
+
     try:
         # 访问IGXE提现页面
         driver.get("https://www.igxe.cn/cashout")
-        time.sleep(2)  # 等待页面加载
         
-        # 等待余额元素出现
-        balance_element = WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, ".wallet-tixian--money .c-4"))
-        )
+        # 等待余额元素出现并填充数值
+        balance_element = wait_for_text(driver, (By.CSS_SELECTOR, ".wallet-tixian--money .c-4"), 'IGXE余额')
         
         # 提取余额值
         balance_text = balance_element.text.replace('￥', '').strip()
         balance = float(balance_text)
         
-        print(f"成功获取IGXE余额: {balance}")
+        logger.info("成功获取IGXE余额: %s", balance)
         return balance
         
     except Exception as e:
-        print(f"获取IGXE余额失败: {str(e)}")
+        logger.error("获取IGXE余额失败: %s", e)
         return None  # 返回None而不是0，表示获取失败
\ No newline at end of file
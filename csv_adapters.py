@@ -0,0 +1,223 @@
+import io
+import logging
+
+logger = logging.getLogger(__name__)
+
+# pandas 在实际解析导出文件时才在各函数内导入，Web进程启动时不需要加载
+
+# BUFF导出的 =HYPERLINK("url", "name") 格式
+HYPERLINK_PATTERN = r'=HYPERLINK\([^"]*"(?P<item_url>[^"]*)"[^"]*"(?P<item_name>[^"]*)"'
+
+# 悠悠有品的日期格式 (2025.02.2114:02:00)
+YOUPIN_DATE_FORMAT = '%Y.%m.%d%H:%M:%S'
+
+# 适配器输出的列及类型
+FRAME_COLUMNS = ['item_name', 'item_url', 'price', 'trade_time']
+
+# 平台目录名 -> 适配器，按注册顺序遍历
+PLATFORM_ADAPTERS = {}
+
+
+def register_adapter(directory, display_name):
+    """
+    注册平台导出文件适配器
+
+    Args:
+        directory: 平台目录名（data 下的子目录）
+        display_name: 平台显示名称
+    """
+    def decorator(cls):
+        adapter = cls()
+        adapter.directory = directory
+        adapter.display_name = display_name
+        PLATFORM_ADAPTERS[directory] = adapter
+        return cls
+    return decorator
+
+
+def get_adapter(directory):
+    """返回平台目录对应的适配器，未注册时返回 None"""
+    return PLATFORM_ADAPTERS.get(directory)
+
+
+def read_export(file_path, offset=0):
+    """
+    将导出文件整体读取为字符串列组成的DataFrame
+
+    offset 大于0时只读取表头和从该字节位置开始的内容（文件追加的新行）
+    """
+    import pandas as pd
+
+    with open(file_path, 'rb') as f:
+        if offset:
+            header = f.readline()
+            f.seek(offset)
+            source = io.BytesIO(header + f.read())
+        else:
+            source = io.BytesIO(f.read())
+    frame = pd.read_csv(source, dtype=str, keep_default_na=False, encoding='utf-8')
+    # 去掉首列名上可能残留的BOM
+    frame.columns = [column.lstrip('\ufeff') for column in frame.columns]
+    return frame
+
+
+def text_column(frame, column, default=''):
+    """取字符串列，缺失的列以默认值填充"""
+    import pandas as pd
+
+    if column in frame.columns:
+        return frame[column].astype(str)
+    return pd.Series(default, index=frame.index, dtype=str)
+
+
+def clean_prices(prices):
+    """去掉货币符号并转换为浮点数，无法解析的价格为 NaN"""
+    import pandas as pd
+
+    cleaned = prices.str.replace('¥', '', regex=False).str.replace('￥', '', regex=False).str.strip()
+    return pd.to_numeric(cleaned, errors='coerce').astype('float64')
+
+
+def standardize_dates(times):
+    """统一日期格式为 YYYY-MM-DD HH:MM:SS，与 matching.standardize_date 相同"""
+    import pandas as pd
+
+    times = times.astype(str)
+    youpin_mask = times.str.contains('.', regex=False) & (times.str.len() == 19)
+    if not youpin_mask.any():
+        return times
+    parsed = pd.to_datetime(times[youpin_mask], format=YOUPIN_DATE_FORMAT, errors='coerce')
+    failed = parsed.isna()
+    if failed.any():
+        logger.warning("日期格式转换失败%d条，保留原值，例如: %s", int(failed.sum()), times[youpin_mask][failed].iloc[0])
+    formatted = parsed.dt.strftime('%Y-%m-%d %H:%M:%S').where(~failed, times[youpin_mask])
+    times = times.copy()
+    times[youpin_mask] = formatted
+    return times
+
+
+class PlatformAdapter:
+    """
+    平台导出文件适配器
+
+    子类只需实现 extract()，从原始字符串列中取出名称、链接、价格和时间文本；
+    load() 负责整体清洗价格、统一日期并返回带类型的列式结果。
+    """
+    directory = None
+    display_name = None
+
+    def extract(self, raw):
+        """
+        Returns:
+            DataFrame: item_name, item_url, price_text, time_text 四列
+        """
+        raise NotImplementedError
+
+    def load(self, file_path, offset=0):
+        """
+        解析整个导出文件
+
+        Args:
+            file_path: CSV文件路径
+            offset: 从该字节位置开始解析（表头仍从文件开头读取）
+
+        Returns:
+            DataFrame: item_name(str), item_url(str或None), price(float64), trade_time(str)
+        """
+        import pandas as pd
+
+        raw = read_export(file_path, offset)
+        if raw.empty:
+            return self.empty_frame()
+
+        extracted = self.extract(raw)
+        prices = clean_prices(extracted['price_text'])
+        invalid = prices.isna()
+        if invalid.any():
+            logger.warning("无效的价格格式%d条，跳过这些记录，例如: %s",
+                           int(invalid.sum()), extracted['price_text'][invalid].iloc[0])
+
+        item_urls = extracted['item_url'].astype(object)
+        frame = pd.DataFrame({
+            'item_name': extracted['item_name'],
+            'item_url': item_urls.where(item_urls.notna(), None),
+            'price': prices,
+            'trade_time': standardize_dates(extracted['time_text'])
+        })[~invalid]
+        return frame.reset_index(drop=True)
+
+    @staticmethod
+    def empty_frame():
+        import pandas as pd
+
+        frame = pd.DataFrame({column: pd.Series(dtype=object) for column in FRAME_COLUMNS})
+        frame['price'] = frame['price'].astype('float64')
+        return frame
+
+    @staticmethod
+    def no_urls(index):
+        import pandas as pd
+
+        return pd.Series(None, index=index, dtype=object)
+
+
+class GenericAdapter(PlatformAdapter):
+    """name/price/time 格式的通用导出文件"""
+
+    def extract(self, raw):
+        import pandas as pd
+
+        return pd.DataFrame({
+            'item_name': text_column(raw, 'name'),
+            'item_url': self.no_urls(raw.index),
+            'price_text': text_column(raw, 'price', '0'),
+            'time_text': text_column(raw, 'time')
+        })
+
+
+@register_adapter('buff', 'BUFF')
+class BuffAdapter(PlatformAdapter):
+    """BUFF导出文件，饰品列为 =HYPERLINK(...) 格式"""
+
+    def extract(self, raw):
+        import pandas as pd
+
+        item_info = text_column(raw, '饰品')
+        links = item_info.str.extract(HYPERLINK_PATTERN)
+        is_link = links['item_url'].notna()
+        return pd.DataFrame({
+            'item_name': links['item_name'].where(is_link, item_info).astype(object),
+            'item_url': links['item_url'],
+            'price_text': text_column(raw, '价格', '0'),
+            'time_text': text_column(raw, '时间')
+        })
+
+
+@register_adapter('youyou', '悠悠')
+class YoupinAdapter(PlatformAdapter):
+    """悠悠有品OCR识别后生成的导出文件"""
+
+    def extract(self, raw):
+        import pandas as pd
+
+        item_names = text_column(raw, '饰品').str.strip()
+        empty = item_names == ''
+        if empty.any():
+            logger.warning("发现空的商品名称%d条，跳过这些记录", int(empty.sum()))
+        raw = raw[~empty]
+        return pd.DataFrame({
+            'item_name': item_names[~empty].astype(object),
+            'item_url': self.no_urls(raw.index),
+            'price_text': text_column(raw, '价格', '0'),
+            'time_text': text_column(raw, '时间')
+        })
+
+
+@register_adapter('igxe', 'IGXE')
+class IgxeAdapter(GenericAdapter):
+    """IGXE导出文件"""
+
+
+@register_adapter('c5', 'C5')
+class C5Adapter(GenericAdapter):
+    """C5导出文件"""
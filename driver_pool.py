@@ -0,0 +1,188 @@
+import os
+import json
+import time
+import atexit
+import logging
+import threading
+from contextlib import contextmanager
+
+from crawler import get_chrome_driver, parse_cookie_string, verify_cookies
+
+logger = logging.getLogger(__name__)
+
+# 各平台登录用的首页地址和cookies文件
+PLATFORM_LOGINS = {
+    'buff': ('https://buff.163.com/?game=csgo', 'data/cookie/buff_cookies.json'),
+    'igxe': ('https://www.igxe.cn/', 'data/cookie/igxe_cookies.json'),
+    'youpin': ('https://www.youpin898.com/', 'data/cookie/youpin_cookies.json'),
+}
+
+
+def login(driver, platform):
+    """打开平台首页并加载保存的cookies"""
+    home_url, cookie_file = PLATFORM_LOGINS[platform]
+    driver.get(home_url)
+    if not os.path.exists(cookie_file):
+        logger.warning("未找到%s，请先运行对应的保存cookies脚本", cookie_file)
+        return
+    with open(cookie_file, 'r') as f:
+        cookies = json.load(f)
+    # 如果cookies是字符串格式，转换为对象列表
+    if isinstance(cookies, str):
+        cookies = parse_cookie_string(cookies)
+    if platform == 'buff' and not verify_cookies(cookies):
+        raise Exception("BUFF Cookies无效或已过期")
+    for cookie in cookies:
+        driver.add_cookie(cookie)
+    # 刷新页面使cookies生效
+    driver.refresh()
+
+
+class PooledDriver:
+    """池中的浏览器及其使用情况"""
+
+    def __init__(self, platform, driver):
+        self.platform = platform
+        self.driver = driver
+        self.created_at = time.monotonic()
+        self.uses = 0
+        self.broken = False
+
+    def quit(self):
+        try:
+            self.driver.quit()
+        except Exception:
+            pass
+
+
+class DriverPool:
+    """
+    已登录的浏览器池
+
+    每个平台保留若干个已加载cookies的无头浏览器，借出给调用方后归还，
+    再次刷新时不需要重新启动浏览器和加载cookies。
+    借出前检查浏览器是否可用；使用超过 max_uses 次、超过 max_age 秒或使用中出错的浏览器会被关闭，
+    下次借出时重新启动并登录。
+    """
+
+    def __init__(self, max_uses=20, max_age=1800, max_idle_per_platform=1, headless=True):
+        self.max_uses = max_uses
+        self.max_age = max_age
+        self.max_idle_per_platform = max_idle_per_platform
+        self.headless = headless
+        self._lock = threading.Lock()
+        self._idle = {platform: [] for platform in PLATFORM_LOGINS}
+        self._leased = {}  # id(driver) -> PooledDriver
+
+    def _create(self, platform):
+        started = time.monotonic()
+        driver = get_chrome_driver(headless=self.headless)
+        pooled = PooledDriver(platform, driver)
+        try:
+            login(driver, platform)
+        except Exception:
+            pooled.quit()
+            raise
+        logger.info("已启动%s浏览器并加载cookies，用时%.2fs", platform, time.monotonic() - started)
+        return pooled
+
+    def _healthy(self, pooled):
+        """浏览器是否可以继续使用"""
+        if pooled.broken or pooled.uses >= self.max_uses:
+            return False
+        if time.monotonic() - pooled.created_at >= self.max_age:
+            return False
+        try:
+            # 浏览器已崩溃或被关闭时会抛出异常
+            return bool(pooled.driver.window_handles)
+        except Exception:
+            return False
+
+    def _acquire(self, platform):
+        while True:
+            with self._lock:
+                pooled = self._idle[platform].pop() if self._idle[platform] else None
+            if pooled is None:
+                pooled = self._create(platform)
+                break
+            if self._healthy(pooled):
+                break
+            logger.info("回收%s浏览器（已使用%d次）", platform, pooled.uses)
+            pooled.quit()
+        with self._lock:
+            self._leased[id(pooled.driver)] = pooled
+        return pooled
+
+    def _release(self, pooled):
+        with self._lock:
+            self._leased.pop(id(pooled.driver), None)
+            pooled.uses += 1
+            keep = (not pooled.broken and pooled.uses < self.max_uses
+                    and len(self._idle[pooled.platform]) < self.max_idle_per_platform)
+            if keep:
+                self._idle[pooled.platform].append(pooled)
+        if not keep:
+            logger.info("回收%s浏览器（已使用%d次）", pooled.platform, pooled.uses)
+            pooled.quit()
+
+    @contextmanager
+    def lease(self, platform):
+        """
+        借出已登录指定平台的浏览器，with 块结束时归还
+
+        with 块中抛出异常时浏览器会被关闭，不再放回池中。
+        """
+        pooled = self._acquire(platform)
+        try:
+            yield pooled.driver
+        except BaseException:
+            pooled.broken = True
+            raise
+        finally:
+            self._release(pooled)
+
+    def invalidate(self, driver):
+        """标记借出的浏览器不可再用（如获取不到数据、可能已退出登录），归还时关闭"""
+        with self._lock:
+            pooled = self._leased.get(id(driver))
+        if pooled is not None:
+            pooled.broken = True
+
+    def warm(self, platforms=None):
+        """在后台为各平台预先启动并登录浏览器"""
+        def run():
+            for platform in platforms or PLATFORM_LOGINS:
+                with self._lock:
+                    if self._idle[platform]:
+                        continue
+                try:
+                    pooled = self._create(platform)
+                except Exception as e:
+                    logger.error("预热%s浏览器失败: %s", platform, e)
+                    continue
+                with self._lock:
+                    self._idle[platform].append(pooled)
+
+        threading.Thread(target=run, name='driver-pool-warm', daemon=True).start()
+
+    def status(self):
+        """各平台空闲和借出的浏览器数量"""
+        with self._lock:
+            leased = [pooled.platform for pooled in self._leased.values()]
+            return {
+                platform: {'idle': len(idle), 'leased': leased.count(platform)}
+                for platform, idle in self._idle.items()
+            }
+
+    def close_all(self):
+        """关闭所有空闲的浏览器"""
+        with self._lock:
+            idle = [pooled for drivers in self._idle.values() for pooled in drivers]
+            for drivers in self._idle.values():
+                drivers.clear()
+        for pooled in idle:
+            pooled.quit()
+
+
+driver_pool = DriverPool()
+atexit.register(driver_pool.close_all)
@@ -0,0 +1,163 @@
+import os
+import json
+import logging
+import threading
+
+from crawler import parse_cookie_string
+
+logger = logging.getLogger(__name__)
+
+# 各平台的cookies文件
+COOKIE_FILES = {
+    'buff': 'data/cookie/buff_cookies.json',
+    'igxe': 'data/cookie/igxe_cookies.json',
+    'youpin': 'data/cookie/youpin_cookies.json',
+}
+
+# 各平台的接口地址，设置环境变量 SCRAPER_BASE_URL 后所有平台都请求该地址（如本地模拟服务器）
+BASE_URLS = {
+    'buff': 'https://buff.163.com',
+    'igxe': 'https://www.igxe.cn',
+    'youpin': 'https://api.youpin898.com',
+}
+
+# 连接和读取超时（秒）
+REQUEST_TIMEOUT = (3.05, 10)
+
+USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+              '(KHTML, like Gecko) Chrome/124.0 Safari/537.36')
+
+
+class HttpScrapeError(Exception):
+    """接口请求失败、未登录或返回的数据无法解析"""
+
+
+def parse_buff(field):
+    """BUFF接口：{"code": "OK", "data": {...}}"""
+    def parse(payload):
+        if payload.get('code') != 'OK':
+            raise HttpScrapeError(payload.get('error') or payload.get('msg') or payload.get('code'))
+        return float(payload['data'][field])
+    return parse
+
+
+def parse_igxe(field):
+    """IGXE接口：{"succ": true, "data": {...}}"""
+    def parse(payload):
+        if not payload.get('succ'):
+            raise HttpScrapeError(payload.get('msg') or '请求失败')
+        return float(str(payload['data'][field]).replace('￥', '').strip())
+    return parse
+
+
+def parse_youpin(field):
+    """悠悠有品接口：{"Code": 0, "Data": {...}}"""
+    def parse(payload):
+        if payload.get('Code') != 0:
+            raise HttpScrapeError(payload.get('Msg') or f"Code {payload.get('Code')}")
+        return float(payload['Data'][field])
+    return parse
+
+
+# (平台, 数据) -> (接口路径, 查询参数, 解析函数)
+# 实验性：接口地址和返回字段只在 benchmarks/platform_stub.py 上测试过，未在真实平台上验证，因此接口抓取默认关闭（见 app.py 的 HTTP_SCRAPING）
+ENDPOINTS = {
+    ('buff', 'balance'): ('/api/asset/get_brief_asset/', {'game': 'csgo'}, parse_buff('cash_amount')),
+    ('buff', 'inventory_value'): ('/api/market/steam_inventory',
+                                  {'game': 'csgo', 'page_num': 1, 'page_size': 50, 'state': 'all'},
+                                  parse_buff('total_amount')),
+    ('igxe', 'balance'): ('/rest/user/wallet', {}, parse_igxe('balance')),
+    ('youpin', 'balance'): ('/api/user/Account/getUserInfo', {}, parse_youpin('TotalMoney')),
+}
+
+
+def load_cookies(cookie_file):
+    """读取保存的cookies，返回 {名称: 值}"""
+    if not os.path.exists(cookie_file):
+        raise HttpScrapeError(f"未找到{cookie_file}")
+    with open(cookie_file, 'r') as f:
+        cookies = json.load(f)
+    if isinstance(cookies, str):
+        cookies = parse_cookie_string(cookies)
+    return {cookie['name']: cookie['value'] for cookie in cookies}
+
+
+class HttpScraper:
+    """
+    不启动浏览器，直接用保存的cookies请求平台接口
+
+    每个平台复用一个 requests.Session（保持连接），cookies文件更新后自动重新加载。
+    """
+
+    def __init__(self, base_url=None, cookie_files=None):
+        self.base_url = base_url or os.environ.get('SCRAPER_BASE_URL')
+        self.cookie_files = cookie_files or COOKIE_FILES
+        self._lock = threading.Lock()
+        self._sessions = {}  # 平台 -> (Session, cookies文件修改时间)
+
+    def _session(self, platform):
+        import requests
+
+        cookie_file = self.cookie_files[platform]
+        mtime = os.path.getmtime(cookie_file) if os.path.exists(cookie_file) else None
+        with self._lock:
+            cached = self._sessions.get(platform)
+            if cached is not None and cached[1] == mtime:
+                return cached[0]
+            session = requests.Session()
+            session.headers.update({
+                'User-Agent': USER_AGENT,
+                'Accept': 'application/json',
+                'Referer': f"{BASE_URLS[platform]}/",
+            })
+            # 不限定域名，请求本地模拟服务器时同样携带
+            for name, value in load_cookies(cookie_file).items():
+                session.cookies.set(name, value)
+            if cached is not None:
+                cached[0].close()
+            self._sessions[platform] = (session, mtime)
+            return session
+
+    def fetch(self, platform, kind):
+        """
+        请求平台接口并解析出数值
+
+        Raises:
+            HttpScrapeError: 请求失败、未登录或返回的数据无法解析
+        """
+        import requests
+
+        path, params, parse = ENDPOINTS[(platform, kind)]
+        url = f"{(self.base_url or BASE_URLS[platform]).rstrip('/')}{path}"
+        try:
+            response = self._session(platform).get(url, params=params, timeout=REQUEST_TIMEOUT)
+            response.raise_for_status()
+            return parse(response.json())
+        except HttpScrapeError:
+            raise
+        except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+            raise HttpScrapeError(f"请求{url}失败: {e}") from e
+
+    def get_balance(self, platform):
+        return self.fetch(platform, 'balance')
+
+    def get_buff_balance(self):
+        return self.get_balance('buff')
+
+    def get_igxe_balance(self):
+        return self.get_balance('igxe')
+
+    def get_youpin_balance(self):
+        return self.get_balance('youpin')
+
+    def get_inventory_value(self):
+        return self.fetch('buff', 'inventory_value')
+
+    def close(self):
+        with self._lock:
+            for session, _ in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+http_scraper = HttpScraper()
@@ -0,0 +1,70 @@
+import os
+import re
+import sys
+import subprocess
+
+# python -X importtime 输出的行格式: "import time: 自身耗时 | 累计耗时 | 模块名"（微秒，缩进表示层级）
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s*\|\s*(\d+)\s*\|(\s*)(\S+)')
+
+
+def collect_import_times(module='app', cwd=None):
+    """
+    在新的解释器中以 -X importtime 导入模块，返回各模块的导入耗时
+
+    Returns:
+        list: [(模块名, 层级, 自身耗时微秒, 累计耗时微秒)]，顺序与 importtime 输出相同（子模块在前）
+    """
+    cwd = cwd or os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=cwd, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"导入 {module} 失败:\n{result.stderr[-2000:]}")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        level = (len(indent) - 1) // 2
+        if level == 0 and name != module:
+            # 解释器启动时（site等）导入的模块，不计入目标模块
+            entries = []
+            continue
+        entries.append((name, level, int(self_us), int(cumulative_us)))
+        if level == 0:
+            break
+    return entries
+
+
+def format_report(module, entries, top=15):
+    """按直接导入的模块和顶层包汇总导入耗时"""
+    total = entries[-1][3] if entries else 0
+
+    # 目标模块直接导入的模块（层级比目标模块深一级）
+    direct = [(name, cumulative) for name, level, _, cumulative in entries if level == 1]
+    direct.sort(key=lambda entry: entry[1], reverse=True)
+
+    # 按顶层包汇总自身耗时
+    packages = {}
+    for name, _, self_us, _ in entries:
+        package = name.split('.')[0]
+        packages[package] = packages.get(package, 0) + self_us
+    package_times = sorted(packages.items(), key=lambda entry: entry[1], reverse=True)
+
+    lines = [f"导入 {module} 共用时 {total / 1000:.1f} ms，加载模块 {len(entries)} 个", '']
+    lines.append(f"{module} 直接导入的模块（累计耗时）:")
+    for name, cumulative in direct[:top]:
+        lines.append(f"  {cumulative / 1000:>8.1f} ms  {name}")
+    lines.append('')
+    lines.append('按顶层包汇总（自身耗时之和）:')
+    for package, self_us in package_times[:top]:
+        lines.append(f"  {self_us / 1000:>8.1f} ms  {package}")
+    return '\n'.join(lines)
+
+
+def print_import_profile(module='app', top=15):
+    """打印模块的启动导入耗时报告"""
+    print(format_report(module, collect_import_times(module), top))
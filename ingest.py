@@ -0,0 +1,220 @@
+import os
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from models import db, TradeRecord, IngestedFile
+from matching import canonical_item_name
+from csv_adapters import PLATFORM_ADAPTERS, get_adapter
+from log_config import row_sampler
+
+logger = logging.getLogger(__name__)
+
+# 交易记录所在的平台目录及显示名称，由注册的导出文件适配器决定
+TRADE_PLATFORMS = list(PLATFORM_ADAPTERS)
+PLATFORM_DISPLAY_NAMES = {directory: adapter.display_name for directory, adapter in PLATFORM_ADAPTERS.items()}
+
+_sync_lock = threading.Lock()
+
+
+def hash_file(file_path, prefix_size=None, chunk_size=1024 * 1024):
+    """
+    计算文件内容的SHA1哈希
+
+    Args:
+        prefix_size: 同时计算文件前 prefix_size 字节的哈希，用于判断文件是否只是追加了新内容
+
+    Returns:
+        prefix_size 为空时返回整个文件的哈希；
+        否则返回 (整个文件的哈希, 前缀的哈希, 前缀是否以换行结尾)
+    """
+    sha1 = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        if prefix_size is None:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                sha1.update(chunk)
+            return sha1.hexdigest()
+
+        prefix = f.read(prefix_size)
+        sha1.update(prefix)
+        prefix_sha1 = sha1.hexdigest()
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            sha1.update(chunk)
+        return sha1.hexdigest(), prefix_sha1, prefix.endswith(b'\n')
+
+
+def iter_trade_files(data_dir='data'):
+    """
+    遍历所有平台目录下的交易CSV文件
+
+    Yields:
+        tuple: (平台目录名, 文件路径, 是否为买入记录)
+    """
+    for platform in TRADE_PLATFORMS:
+        platform_dir = os.path.join(data_dir, platform)
+        if not os.path.exists(platform_dir):
+            continue
+        for filename in os.listdir(platform_dir):
+            # 检查是否是CSV文件
+            if not filename.endswith('.csv'):
+                continue
+
+            # 判断是买入还是卖出记录
+            is_buy = 'buy' in filename.lower()
+            is_sale = 'sale' in filename.lower()
+            if not (is_buy or is_sale):
+                continue
+
+            yield platform, os.path.join(platform_dir, filename), is_buy
+
+
+def build_record_rows(platform, file_path, is_buy, frame):
+    """
+    将适配器解析出的列式结果转换为 trade_record 表的行
+
+    Args:
+        platform: 平台目录名
+        file_path: CSV文件路径
+        is_buy: 是否为买入记录
+        frame: 适配器返回的 DataFrame（item_name, item_url, price, trade_time）
+
+    Returns:
+        list: 可直接批量写入的行字典列表
+    """
+    platform_name = PLATFORM_DISPLAY_NAMES[platform]
+    trade_type = 'buy' if is_buy else 'sale'
+    canonical_names = frame['item_name'].map(canonical_item_name)
+    rows = [
+        {
+            'source_file': file_path,
+            'platform': platform_name,
+            'type': trade_type,
+            'item_name': item_name,
+            'canonical_name': canonical_name,
+            'item_url': item_url,
+            'price': price,
+            'trade_time': trade_time
+        }
+        for item_name, canonical_name, item_url, price, trade_time in zip(
+            frame['item_name'].tolist(), canonical_names.tolist(), frame['item_url'].tolist(),
+            frame['price'].tolist(), frame['trade_time'].tolist()
+        )
+    ]
+
+    debug_rows = row_sampler(logger)
+    if debug_rows:
+        for row in rows:
+            debug_rows.debug("解析%s记录: %s %s %s", platform, row['item_name'], row['price'], row['trade_time'])
+    return rows
+
+
+def file_item_keys(file_path):
+    """返回某个文件的明细已归并到的商品键"""
+    query = db.session.query(TradeRecord.item_key).filter(
+        TradeRecord.source_file == file_path,
+        TradeRecord.item_key.isnot(None)
+    ).distinct()
+    return {item_key for (item_key,) in query}
+
+
+def ingest_file(platform, file_path, is_buy, record, stat, sha1, offset=0):
+    """
+    导入单个文件
+
+    offset 为0时重新导入整个文件：删除该文件的旧明细并批量写入新明细；
+    否则文件只是在末尾追加了新行，只解析并写入 offset 之后的部分。
+
+    Returns:
+        set: 被删除明细所属的商品键
+    """
+    frame = get_adapter(platform).load(file_path, offset)
+    rows = build_record_rows(platform, file_path, is_buy, frame)
+
+    removed_keys = set()
+    if offset:
+        row_count = record.row_count + len(rows)
+    else:
+        removed_keys = file_item_keys(file_path)
+        TradeRecord.query.filter_by(source_file=file_path).delete()
+        row_count = len(rows)
+    if rows:
+        db.session.execute(db.insert(TradeRecord), rows)
+
+    if record is None:
+        record = IngestedFile(path=file_path)
+        db.session.add(record)
+    record.size = stat.st_size
+    record.mtime = stat.st_mtime_ns
+    record.sha1 = sha1
+    record.row_count = row_count
+    record.ingested_at = datetime.now()
+    db.session.commit()
+    if offset:
+        logger.info("文件 %s 追加导入 %s 条记录", os.path.basename(file_path), len(rows))
+    else:
+        logger.info("文件 %s 导入完成，共 %s 条记录", os.path.basename(file_path), len(rows))
+    return removed_keys
+
+
+def sync_trade_records(data_dir='data'):
+    """
+    将各平台的交易导出文件同步到数据库
+
+    先比较文件大小和修改时间，两者一致即跳过；若不一致再比较内容哈希。
+    文件只在末尾追加了内容时（原有部分哈希不变）只导入新增的行，
+    其他内容变化的文件整体重新导入。需要在应用上下文中调用。
+
+    Returns:
+        set: 因文件改写或删除而被移除的明细所属的商品键，新写入的明细 item_key 为空
+    """
+    with _sync_lock:
+        ingested = {record.path: record for record in IngestedFile.query.all()}
+        removed_keys = set()
+        seen_paths = set()
+
+        for platform, file_path, is_buy in iter_trade_files(data_dir):
+            seen_paths.add(file_path)
+            try:
+                stat = os.stat(file_path)
+                record = ingested.get(file_path)
+                if record and record.size == stat.st_size and record.mtime == stat.st_mtime_ns:
+                    continue
+
+                offset = 0
+                if record and stat.st_size > record.size:
+                    sha1, prefix_sha1, prefix_complete = hash_file(file_path, prefix_size=record.size)
+                    if prefix_sha1 == record.sha1 and prefix_complete:
+                        # 原有内容未变，只在末尾追加了新行
+                        offset = record.size
+                else:
+                    sha1 = hash_file(file_path)
+
+                if record and record.sha1 == sha1:
+                    # 仅修改时间变化，内容未变
+                    record.size = stat.st_size
+                    record.mtime = stat.st_mtime_ns
+                    db.session.commit()
+                    continue
+
+                removed_keys |= ingest_file(platform, file_path, is_buy, record, stat, sha1, offset)
+            except Exception as e:
+                db.session.rollback()
+                logger.error("处理%s平台%s文件时出错: %s", platform, os.path.basename(file_path), e)
+
+        # 清理已删除文件的明细，只处理该数据目录下的文件（data_old 等同名前缀的目录不算）
+        data_prefix = data_dir.rstrip(os.sep) + os.sep
+        for path, record in ingested.items():
+            if path in seen_paths or not path.startswith(data_prefix):
+                continue
+            removed_keys |= file_item_keys(path)
+            TradeRecord.query.filter_by(source_file=path).delete()
+            db.session.delete(record)
+            db.session.commit()
+
+        return removed_keys
+
+
+def load_trade_records():
+    """从数据库读取所有交易明细，按导入顺序返回交易记录字典列表"""
+    records = TradeRecord.query.order_by(TradeRecord.id).all()
+    return [record.to_trade_dict() for record in records]
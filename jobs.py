@@ -0,0 +1,205 @@
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    """
+    后台任务
+
+    任务函数的第一个参数为任务本身，可通过 report() 更新进度，返回值作为任务结果。
+    """
+
+    def __init__(self, key, name):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.name = name
+        self.state = 'queued'  # queued / running / succeeded / failed
+        self.message = None
+        self.progress = 0.0
+        self.result = None
+        self.error = None
+        self.skipped = []  # 提交时已有任务在执行、本任务不处理的去重键，见 JobScheduler.submit 的 skip_keys
+        self.created_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+        self._done = threading.Event()
+
+    @property
+    def finished(self):
+        return self._done.is_set()
+
+    def report(self, message, progress=None):
+        """
+        更新任务进度
+
+        Args:
+            message: 当前步骤说明
+            progress: 完成比例（0~1），不传时保持不变
+        """
+        self.message = message
+        if progress is not None:
+            self.progress = max(0.0, min(1.0, progress))
+        logger.debug("任务%s(%s)：%s", self.name, self.id, message)
+
+    def wait(self, timeout=None):
+        """等待任务结束，返回是否已结束"""
+        return self._done.wait(timeout)
+
+    def to_dict(self):
+        """任务状态，用于任务查询接口"""
+        return {
+            'id': self.id,
+            'key': self.key,
+            'name': self.name,
+            'state': self.state,
+            'message': self.message,
+            'progress': round(self.progress, 3),
+            'result': self.result,
+            'error': self.error,
+            'skipped': self.skipped,
+            'created_at': self.created_at.isoformat(timespec='seconds'),
+            'started_at': self.started_at.isoformat(timespec='seconds') if self.started_at else None,
+            'finished_at': self.finished_at.isoformat(timespec='seconds') if self.finished_at else None
+        }
+
+
+class JobScheduler:
+    """
+    后台任务调度
+
+    任务在有上限的线程池中、在应用上下文内执行，提交后立即返回任务。
+    同一 key 的任务未结束时再次提交，返回正在执行的任务而不会重复执行；
+    schedule() 按固定间隔重复提交任务（遇到同一 key 的任务未结束时同样合并）。
+    """
+
+    def __init__(self, max_workers=2, keep_finished=100):
+        self.keep_finished = keep_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()  # 任务ID -> 任务，按提交顺序
+        self._active = {}  # key -> 未结束的任务
+        self._schedules = {}  # key -> 停止定时任务的Event
+        self._app = None
+
+    def init_app(self, app):
+        """任务在该应用的应用上下文中执行"""
+        self._app = app
+
+    def submit(self, key, name, func, *args, join_keys=(), skip_keys=(), **kwargs):
+        """
+        提交任务
+
+        Args:
+            key: 去重键，同一 key 同一时间最多一个任务在排队或执行
+            name: 任务名称
+            func: 任务函数 func(job, *args, **kwargs)
+            join_keys: 其他去重键，这些键的任务未结束且没有跳过 key 时同样合并到该任务
+                       （如单个平台的任务合并到正在更新该平台的全部平台任务）
+            skip_keys: 提交时这些键已有任务未结束时，记录到 job.skipped，由任务函数跳过对应的工作
+                       （如全部平台的任务跳过正在单独更新的平台）
+
+        Returns:
+            tuple: (任务, 是否合并到了已有任务)
+        """
+        with self._lock:
+            active = self._active.get(key)
+            if active is not None:
+                return active, True
+            for join_key in join_keys:
+                active = self._active.get(join_key)
+                if active is not None and key not in active.skipped:
+                    return active, True
+            job = Job(key, name)
+            job.skipped = [skip_key for skip_key in skip_keys if skip_key in self._active]
+            self._jobs[job.id] = job
+            self._active[key] = job
+            self._discard_finished()
+        logger.info("已提交任务%s(%s)", name, job.id)
+        self._executor.submit(self._run, job, func, args, kwargs)
+        return job, False
+
+    def _run(self, job, func, args, kwargs):
+        job.state = 'running'
+        job.started_at = datetime.now()
+        try:
+            if self._app is not None:
+                with self._app.app_context():
+                    job.result = func(job, *args, **kwargs)
+            else:
+                job.result = func(job, *args, **kwargs)
+            job.state = 'succeeded'
+            job.progress = 1.0
+            logger.info("任务%s完成，用时%.2fs", job.name, (datetime.now() - job.started_at).total_seconds())
+        except Exception as e:
+            job.state = 'failed'
+            job.error = str(e)
+            logger.exception("任务%s失败", job.name)
+        finally:
+            job.finished_at = datetime.now()
+            with self._lock:
+                if self._active.get(job.key) is job:
+                    del self._active[job.key]
+            job._done.set()
+
+    def _discard_finished(self):
+        """只保留最近 keep_finished 个已结束的任务（调用时需持有锁）"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._jobs[job_id]
+
+    def active(self, key):
+        """该 key 未结束的任务，没有时返回 None"""
+        with self._lock:
+            return self._active.get(key)
+
+    def get(self, job_id):
+        """按ID查询任务，不存在时返回 None"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        """所有保留的任务，按提交顺序"""
+        with self._lock:
+            return list(self._jobs.values())
+
+    def schedule(self, key, name, interval, func, *args, **kwargs):
+        """
+        每隔 interval 秒提交一次任务，同一 key 重复调用时不会再次启动
+
+        Returns:
+            bool: 本次调用是否启动了定时任务
+        """
+        with self._lock:
+            if key in self._schedules:
+                return False
+            stopped = threading.Event()
+            self._schedules[key] = stopped
+
+        def loop():
+            while not stopped.wait(interval):
+                self.submit(key, name, func, *args, **kwargs)
+
+        threading.Thread(target=loop, name=f'schedule-{key}', daemon=True).start()
+        logger.info("已启动定时任务%s，每%s秒执行一次", name, interval)
+        return True
+
+    def unschedule(self, key):
+        """停止定时任务，返回是否存在该定时任务"""
+        with self._lock:
+            stopped = self._schedules.pop(key, None)
+        if stopped is None:
+            return False
+        stopped.set()
+        return True
+
+    def shutdown(self, wait=True):
+        """停止所有定时任务并关闭线程池"""
+        for key in list(self._schedules):
+            self.unschedule(key)
+        self._executor.shutdown(wait=wait)
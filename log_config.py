@@ -0,0 +1,76 @@
+import os
+import logging
+
+# 日志格式
+LOG_FORMAT = '%(asctime)s %(levelname)s [%(name)s] %(message)s'
+
+# 逐行调试日志的默认采样间隔（每N条输出1条）
+DEFAULT_SAMPLE_EVERY = 100
+
+
+def parse_module_levels(spec):
+    """
+    解析按模块设置的日志级别
+
+    Args:
+        spec: 形如 "ingest=DEBUG,matching=WARNING" 的字符串
+
+    Returns:
+        dict: 模块名 -> 日志级别名
+    """
+    levels = {}
+    for item in (spec or '').split(','):
+        if '=' not in item:
+            continue
+        name, level = item.split('=', 1)
+        levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure_logging(level=None, module_levels=None):
+    """
+    配置日志输出
+
+    Args:
+        level: 全局日志级别，默认读取环境变量 LOG_LEVEL，未设置时为 INFO
+        module_levels: 按模块设置的日志级别，默认读取环境变量 LOG_LEVELS（如 "ingest=DEBUG"）
+    """
+    level = (level or os.environ.get('LOG_LEVEL') or 'INFO').upper()
+    if module_levels is None:
+        module_levels = parse_module_levels(os.environ.get('LOG_LEVELS'))
+
+    root = logging.getLogger()
+    if not root.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        root.addHandler(handler)
+    root.setLevel(level)
+
+    for name, module_level in module_levels.items():
+        logging.getLogger(name).setLevel(module_level.upper())
+
+
+class RowSampler:
+    """
+    逐行事件的采样调试日志
+
+    只输出第1条及此后每 every 条中的1条，避免大量逐行日志拖慢处理。
+    通过 row_sampler() 获取，调试级别未开启时为 None，热点循环中只需判断一次是否为空。
+    """
+
+    def __init__(self, logger, every=None):
+        self.logger = logger
+        self.every = max(1, every or int(os.environ.get('LOG_SAMPLE_EVERY', DEFAULT_SAMPLE_EVERY)))
+        self.count = 0
+
+    def debug(self, msg, *args):
+        self.count += 1
+        if (self.count - 1) % self.every == 0:
+            self.logger.debug('[%d] ' + msg, self.count, *args)
+
+
+def row_sampler(logger, every=None):
+    """调试级别开启时返回 RowSampler，否则返回 None"""
+    if logger.isEnabledFor(logging.DEBUG):
+        return RowSampler(logger, every)
+    return None
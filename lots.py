@@ -0,0 +1,223 @@
+import heapq
+from collections import deque
+from matching import ItemMatcher, standardize_date
+
+# 批次匹配策略：先进先出、后进先出、成本最高者先出
+LOT_POLICIES = ('fifo', 'lifo', 'hifo')
+
+
+class OpenLots:
+    """单个商品的未平仓买入批次"""
+
+    def __init__(self, policy='fifo'):
+        if policy not in LOT_POLICIES:
+            raise ValueError(f"不支持的批次匹配策略: {policy}")
+        self.policy = policy
+        self._lots = [] if policy == 'hifo' else deque()
+        self._seq = 0
+
+    def __len__(self):
+        return len(self._lots)
+
+    def push(self, lot):
+        """加入一个买入批次"""
+        if self.policy == 'hifo':
+            heapq.heappush(self._lots, (-lot['unit_price'], self._seq, lot))
+            self._seq += 1
+        else:
+            self._lots.append(lot)
+
+    def peek(self):
+        """按策略返回下一个要卖出的批次"""
+        if self.policy == 'fifo':
+            return self._lots[0]
+        if self.policy == 'lifo':
+            return self._lots[-1]
+        return self._lots[0][2]
+
+    def pop(self):
+        """按策略移除下一个要卖出的批次"""
+        if self.policy == 'fifo':
+            return self._lots.popleft()
+        if self.policy == 'lifo':
+            return self._lots.pop()
+        return heapq.heappop(self._lots)[2]
+
+    def remaining(self):
+        """按买入顺序返回剩余批次"""
+        if self.policy == 'hifo':
+            return [lot for _, _, lot in sorted(self._lots, key=lambda entry: entry[1])]
+        return list(self._lots)
+
+
+def _trade_time(trade):
+    """交易记录的标准化时间，买入记录取买入日期，卖出记录取卖出日期"""
+    is_buy = 'purchase_date' in trade
+    return standardize_date((trade['purchase_date'] if is_buy else trade['sale_date']) or '')
+
+
+def match_item_lots(item_key, trades, policy='fifo'):
+    """
+    对单个商品的交易记录按时间顺序进行批次匹配
+
+    买入记录作为新批次入账；卖出记录按策略消耗未平仓批次，拆分出已实现盈亏，
+    没有可匹配批次的卖出数量记为仅卖出记录。剩余批次按该商品最近一笔成交价计算未实现盈亏。
+
+    Args:
+        item_key: 商品键
+        trades: 该商品的交易记录列表
+        policy: 批次匹配策略（fifo/lifo/hifo）
+
+    Returns:
+        dict: {'holdings': 持有批次, 'completed_trades': 成交记录,
+               'realized_profit': 已实现盈亏, 'unrealized_profit': 未实现盈亏}
+    """
+    # 同一时间的买入先于卖出处理
+    events = sorted(
+        ((_trade_time(trade), 0 if 'purchase_date' in trade else 1, seq, trade) for seq, trade in enumerate(trades)),
+        key=lambda event: event[:3]
+    )
+
+    open_lots = OpenLots(policy)
+    completed_trades = []
+    realized_profit = 0.0
+    last_price = None
+
+    for trade_time, _, _, trade in events:
+        quantity = trade.get('quantity', 1)
+        unit_price = trade['unit_price']
+        last_price = unit_price
+
+        if 'purchase_date' in trade:
+            open_lots.push({
+                'item_key': item_key,
+                'item_name': trade['item_name'],
+                'item_url': trade.get('item_url'),
+                'quantity': quantity,
+                'unit_price': unit_price,
+                'total_price': unit_price * quantity,
+                'purchase_date': trade_time,
+                'platform': trade['platform']
+            })
+            continue
+
+        # 卖出：按策略消耗未平仓批次
+        while quantity > 0 and open_lots:
+            lot = open_lots.peek()
+            matched = min(quantity, lot['quantity'])
+            cost = lot['unit_price'] * matched
+            proceeds = unit_price * matched
+            profit = proceeds - cost
+            realized_profit += profit
+            completed_trades.append({
+                'item_key': item_key,
+                'item_name': lot['item_name'],
+                'item_url': lot['item_url'] or trade.get('item_url'),
+                'quantity': matched,
+                'unit_price': lot['unit_price'],
+                'total_price': cost,
+                'sale_price': proceeds,
+                'profit': profit,
+                'profit_ratio': (profit / cost * 100) if cost > 0 else 0,
+                'purchase_date': lot['purchase_date'],
+                'sale_date': trade_time,
+                'platform': '/'.join(sorted({lot['platform'], trade['platform']}))
+            })
+
+            quantity -= matched
+            if matched == lot['quantity']:
+                open_lots.pop()
+            else:
+                lot['quantity'] -= matched
+                lot['total_price'] = lot['unit_price'] * lot['quantity']
+
+        if quantity > 0:
+            # 没有对应买入批次的卖出（如导出范围之前买入）
+            completed_trades.append({
+                'item_key': item_key,
+                'item_name': trade['item_name'],
+                'item_url': trade.get('item_url'),
+                'quantity': quantity,
+                'unit_price': None,
+                'total_price': None,
+                'sale_price': unit_price * quantity,
+                'profit': None,
+                'profit_ratio': None,
+                'purchase_date': None,
+                'sale_date': trade_time,
+                'platform': trade['platform']
+            })
+
+    holdings = []
+    unrealized_profit = 0.0
+    for lot in open_lots.remaining():
+        profit = (last_price - lot['unit_price']) * lot['quantity']
+        unrealized_profit += profit
+        holdings.append(dict(
+            lot,
+            current_price=last_price,
+            unrealized_profit=profit,
+            unrealized_profit_ratio=(profit / lot['total_price'] * 100) if lot['total_price'] > 0 else 0
+        ))
+
+    return {
+        'holdings': holdings,
+        'completed_trades': completed_trades,
+        'realized_profit': realized_profit,
+        'unrealized_profit': unrealized_profit
+    }
+
+
+def group_trades(trades, matcher=None):
+    """
+    将交易记录归并到商品
+
+    Returns:
+        tuple: (商品键 -> 交易记录列表（按首次出现顺序）, 使用的归并器)
+    """
+    valid_trades = [
+        trade for trade in trades
+        if all(key in trade for key in ['item_name', 'platform', 'unit_price'])
+        and ('purchase_date' in trade or 'sale_date' in trade)
+    ]
+    if matcher is None:
+        matcher = ItemMatcher.for_names(trade['item_name'] for trade in valid_trades)
+
+    groups = {}
+    for trade in valid_trades:
+        groups.setdefault(matcher.resolve(trade['item_name']), []).append(trade)
+    return groups, matcher
+
+
+def match_lots(trades, policy='fifo', stats=None):
+    """
+    批次匹配所有交易记录，生成持有批次和成交记录
+
+    先将各平台的交易记录归并到商品，再对每个商品按时间顺序独立匹配，
+    总耗时为排序的 O(n log n)。
+
+    Args:
+        trades: 交易记录列表
+        policy: 批次匹配策略（fifo/lifo/hifo）
+        stats: 可选字典，用于返回商品归并的命中统计
+
+    Returns:
+        dict: 与 match_item_lots 相同的结构，包含所有商品的汇总
+    """
+    groups, matcher = group_trades(trades)
+    if stats is not None:
+        stats.update(matcher.hit_rates())
+
+    result = {
+        'holdings': [],
+        'completed_trades': [],
+        'realized_profit': 0.0,
+        'unrealized_profit': 0.0
+    }
+    for item_key, item_trades in groups.items():
+        item_result = match_item_lots(item_key, item_trades, policy)
+        result['holdings'].extend(item_result['holdings'])
+        result['completed_trades'].extend(item_result['completed_trades'])
+        result['realized_profit'] += item_result['realized_profit']
+        result['unrealized_profit'] += item_result['unrealized_profit']
+    return result
@@ -0,0 +1,307 @@
+import math
+import logging
+from functools import lru_cache
+from datetime import datetime
+from log_config import row_sampler
+
+logger = logging.getLogger(__name__)
+
+# 合并交易记录时的名称相似度阈值
+SIMILARITY_THRESHOLD = 0.6
+
+def standardize_date(date_str):
+    """
+    统一日期格式为 YYYY-MM-DD HH:MM:SS
+    """
+    try:
+        # 处理悠悠有品格式 (2025.02.2114:02:00)
+        if '.' in date_str and len(date_str) == 19:
+            date_obj = datetime.strptime(date_str, '%Y.%m.%d%H:%M:%S')
+            return date_obj.strftime('%Y-%m-%d %H:%M:%S')
+        # 处理BUFF格式 (已经是标准格式)
+        else:
+            return date_str
+    except Exception as e:
+        logger.warning("日期格式转换失败: %s, 错误: %s", date_str, e)
+        return date_str
+
+def get_wear_level(name):
+    """
+    从商品名称中提取磨损等级
+    返回: (磨损等级, 剩余名称)
+    """
+    wear_levels = {
+        '崭新出厂': ['崭新出厂', '崭新'],
+        '略有磨损': ['略有磨损', '略磨'],
+        '久经沙场': ['久经沙场', '久经'],
+        '破损不堪': ['破损不堪', '破损'],
+        '战痕累累': ['战痕累累', '战痕']
+    }
+    
+    # 检查是否是探员或特殊角色
+    agent_features = [
+        '专业人士', '游击队', '海豹部队', '军刀', 'FBI特工',
+        '上校', '中队长', '海军上尉', '指挥官', '特种部队',
+        '达里尔爵士'
+    ]
+    
+    # 检查是否是特殊物品
+    special_items = ['印花', '音乐盒', '挂件', '胸章']
+    
+    # 如果是探员或特殊物品，直接返回None和原始名称
+    if any(agent in name for agent in agent_features) or any(item in name for item in special_items):
+        return None, name
+    
+    # 检查磨损等级
+    for level, keywords in wear_levels.items():
+        for keyword in keywords:
+            if keyword in name:
+                # 移除磨损等级和括号
+                remaining = name.replace(keyword, '').replace('(', '').replace(')', '').replace('（', '').replace('）', '')
+                return level, remaining.strip()
+    
+    return None, name
+
+def calculate_similarity(str1, str2):
+    """
+    计算两个字符串的相似度
+    使用简单的字符匹配算法
+    """
+    if not str1 or not str2:
+        return 0
+    
+    # 将字符串转换为字符集合
+    set1 = set(str1)
+    set2 = set(str2)
+    
+    # 计算交集和并集
+    intersection = len(set1.intersection(set2))
+    union = len(set1.union(set2))
+    
+    # 计算相似度
+    return intersection / union if union > 0 else 0
+
+def standardize_item_name(name):
+    """
+    标准化商品名称，移除特殊字符和多余空格
+    """
+    if not name:
+        return ""
+    
+    # 移除特殊字符，只保留中文、英文和数字
+    name = ''.join(char for char in name if '\u4e00' <= char <= '\u9fff' or char.isalnum())
+    
+    # 移除多余的空格
+    name = ' '.join(name.split())
+    
+    return name
+
+@lru_cache(maxsize=None)
+def split_item_name(name):
+    """
+    拆分商品名称
+    返回: (磨损等级, 标准化名称)
+    """
+    wear_level, remaining_name = get_wear_level(name)
+    return wear_level, standardize_item_name(remaining_name)
+
+def canonical_item_name(name):
+    """
+    生成商品的规范名称：标准化名称 + 磨损等级
+    不同平台对同一饰品的括号样式、空格和磨损简写不同，规范名称可消除这些差异
+    """
+    wear_level, standardized_name = split_item_name(name)
+    if wear_level:
+        return f"{standardized_name}|{wear_level}"
+    return standardized_name
+
+
+# 统计整数中置位比特数（Python 3.10以下没有int.bit_count）
+if hasattr(int, 'bit_count'):
+    popcount = int.bit_count
+else:
+    def popcount(value):
+        return bin(value).count('1')
+
+class CharBitset:
+    """
+    字符位图编码器
+    为出现过的每个字符（中文、英文、数字）分配一个比特位，把名称编码为Python整数位图，
+    字符集合的交集、并集即为按位与、按位或，Jaccard相似度只需两次popcount
+    """
+    
+    def __init__(self):
+        self._bits = {}  # 字符 -> 比特位
+    
+    def encode(self, text):
+        """将名称编码为字符位图"""
+        mask = 0
+        for char in set(text):
+            bit = self._bits.get(char)
+            if bit is None:
+                bit = self._bits[char] = len(self._bits)
+            mask |= 1 << bit
+        return mask
+    
+    @staticmethod
+    def jaccard(mask1, mask2):
+        """计算两个位图的Jaccard相似度，结果与 calculate_similarity 相同"""
+        if not (mask1 and mask2):
+            return 0
+        return popcount(mask1 & mask2) / popcount(mask1 | mask2)
+
+class MatchIndex:
+    """
+    合并交易记录用的候选索引
+    
+    按磨损等级分块：两条记录都有磨损等级时必须相同，没有磨损等级的记录可与任意分块匹配。
+    每个分块内对标准化名称的字符建立倒排索引，并使用前缀过滤：
+    若两个字符集合的Jaccard相似度不低于阈值，则按同一全局顺序排序后，
+    两者的前 |A| - ceil(t*|A|) + 1 个字符必有交集。
+    因此只需与共享前缀字符的少量候选计算相似度，且匹配结果与逐一比较完全一致。
+    
+    查找时先按规范键（磨损等级, 标准化名称）做哈希精确匹配，
+    只有精确匹配失败时才走上述模糊匹配路径，候选的相似度由 CharBitset 位图计算。
+    """
+    
+    def __init__(self, threshold=SIMILARITY_THRESHOLD, token_frequency=None):
+        """
+        Args:
+            threshold: 名称相似度阈值
+            token_frequency: 字符出现频率，用于将稀有字符排在前缀中以缩小候选集
+        """
+        self.threshold = threshold
+        self.token_frequency = token_frequency or {}
+        self.bitset = CharBitset()
+        self._entries = []  # [(键, 字符位图, 字符数)]，按加入顺序
+        self._blocks = {}  # 磨损等级 -> {字符: [条目序号]}
+        self._profile_cache = {}  # 标准化名称 -> (字符位图, 字符数, 前缀字符)
+        self._exact = {}  # (磨损等级, 标准化名称) -> 键
+        self.stats = {'exact': 0, 'fuzzy': 0, 'miss': 0}  # 各匹配路径的命中次数
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def _profile(self, standardized_name):
+        """
+        计算并缓存名称的索引信息
+        返回: (字符位图, 字符数, 前缀字符)，前缀按全局顺序（频率升序）排序
+        """
+        profile = self._profile_cache.get(standardized_name)
+        if profile is None:
+            tokens = sorted(set(standardized_name), key=lambda c: (self.token_frequency.get(c, 0), c))
+            required = math.ceil(round(self.threshold * len(tokens), 9))
+            prefix = tokens[:len(tokens) - required + 1]
+            profile = (self.bitset.encode(standardized_name), len(tokens), prefix)
+            self._profile_cache[standardized_name] = profile
+        return profile
+    
+    def add(self, key, wear_level, standardized_name):
+        """加入一条已合并记录"""
+        entry_id = len(self._entries)
+        if standardized_name:
+            self._exact.setdefault((wear_level, standardized_name), key)
+        mask, size, prefix = self._profile(standardized_name)
+        self._entries.append((key, mask, size))
+        if not standardized_name:
+            # 空名称与任何记录的相似度都为0，无需索引
+            return
+        postings = self._blocks.setdefault(wear_level, {})
+        for token in prefix:
+            postings.setdefault(token, []).append(entry_id)
+    
+    def candidates(self, wear_level, standardized_name):
+        """返回可能匹配的条目序号（升序）"""
+        if not standardized_name:
+            return []
+        if wear_level is None:
+            blocks = self._blocks.values()
+        else:
+            blocks = [self._blocks[level] for level in (wear_level, None) if level in self._blocks]
+        
+        prefix = self._profile(standardized_name)[2]
+        entry_ids = set()
+        for postings in blocks:
+            for token in prefix:
+                entry_ids.update(postings.get(token, ()))
+        return sorted(entry_ids)
+    
+    def find(self, wear_level, standardized_name):
+        """
+        查找匹配记录：规范键精确匹配优先，否则返回最早加入的模糊匹配记录
+        返回: 匹配记录的键，未找到时返回None
+        """
+        key = self._exact.get((wear_level, standardized_name))
+        if key is not None:
+            self.stats['exact'] += 1
+            return key
+        
+        key = self._find_fuzzy(wear_level, standardized_name)
+        self.stats['fuzzy' if key is not None else 'miss'] += 1
+        return key
+    
+    def _find_fuzzy(self, wear_level, standardized_name):
+        """按Jaccard相似度查找最早加入的匹配记录"""
+        mask, size, _ = self._profile(standardized_name)
+        if not mask:
+            return None
+        # 长度过滤：相似度达标时两集合大小之比不低于阈值
+        min_size = self.threshold * size - 1e-9
+        max_size = size / self.threshold + 1e-9
+        for entry_id in self.candidates(wear_level, standardized_name):
+            key, existing_mask, existing_size = self._entries[entry_id]
+            if existing_size < min_size or existing_size > max_size:
+                continue
+            if CharBitset.jaccard(mask, existing_mask) >= self.threshold:
+                return key
+        return None
+    
+    def hit_rates(self):
+        """
+        汇总各匹配路径的命中情况
+        返回: 包含查找次数、精确/模糊命中数、未命中数及对应比例（%）的字典
+        """
+        lookups = sum(self.stats.values())
+        result = {'lookups': lookups}
+        for path, count in self.stats.items():
+            result[path] = count
+            result[f'{path}_rate'] = round(count / lookups * 100, 2) if lookups else 0.0
+        return result
+
+
+class ItemMatcher:
+    """
+    商品归并器
+    为每条交易记录确定所属商品，商品以其首次出现时的名称作为键
+    """
+    
+    def __init__(self, token_frequency=None, threshold=SIMILARITY_THRESHOLD):
+        self.index = MatchIndex(threshold=threshold, token_frequency=token_frequency)
+        self._debug_rows = row_sampler(logger)
+    
+    @classmethod
+    def for_names(cls, names, threshold=SIMILARITY_THRESHOLD):
+        """根据即将归并的名称统计字符频率，稀有字符优先进入索引前缀"""
+        token_frequency = {}
+        for name in names:
+            _, standardized_name = split_item_name(name)
+            for char in set(standardized_name):
+                token_frequency[char] = token_frequency.get(char, 0) + 1
+        return cls(token_frequency=token_frequency, threshold=threshold)
+    
+    def resolve(self, item_name):
+        """
+        返回商品名称所属商品的键，未匹配到已有商品时以该名称新建商品
+        """
+        wear_level, standardized_name = split_item_name(item_name)
+        key = self.index.find(wear_level, standardized_name)
+        if key is None:
+            key = item_name
+            self.index.add(key, wear_level, standardized_name)
+        if self._debug_rows:
+            self._debug_rows.debug("归并 %s -> %s", item_name, key)
+        return key
+    
+    def hit_rates(self):
+        """各匹配路径的命中统计，见 MatchIndex.hit_rates"""
+        return self.index.hit_rates()
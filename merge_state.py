@@ -0,0 +1,276 @@
+import json
+import logging
+import threading
+from collections.abc import Mapping
+from sqlalchemy import func
+from models import db, TradeRecord, ItemLots
+from matching import ItemMatcher, split_item_name
+from lots import match_item_lots
+from log_config import row_sampler
+
+logger = logging.getLogger(__name__)
+
+# SQLite单条语句的参数数量有限，IN查询分批进行
+QUERY_CHUNK_SIZE = 500
+
+TOTAL_FIELDS = ['realized_profit', 'unrealized_profit', 'open_cost', 'buff_buy', 'buff_sale']
+
+
+def item_totals(result):
+    """计算单个商品批次匹配结果的汇总值"""
+    holdings = result['holdings']
+    completed_trades = result['completed_trades']
+    return {
+        'realized_profit': result['realized_profit'],
+        'unrealized_profit': result['unrealized_profit'],
+        'open_cost': sum(lot['total_price'] for lot in holdings),
+        'buff_buy': sum(lot['total_price'] for lot in holdings if lot['platform'] == 'BUFF'),
+        'buff_sale': sum(trade['sale_price'] for trade in completed_trades if trade['platform'] == 'BUFF')
+    }
+
+
+class LotsSnapshot(Mapping):
+    """
+    某一版本的合并结果（只读）
+
+    发布时只复制商品键到匹配结果的映射（匹配结果本身在重新匹配时整体替换，不会被修改），
+    holdings 和 completed_trades 在首次访问时才按商品顺序展开并缓存，
+    只需要汇总值和记录数的读取方（如 /api/summary）不需要展开全部批次。
+    """
+
+    LAZY_FIELDS = ('holdings', 'completed_trades')
+
+    def __init__(self, items, totals, counts, merge_stats, version):
+        self._items = items
+        self._fields = {
+            'totals': totals,
+            'holdings_count': counts['holdings'],
+            'completed_trades_count': counts['completed_trades'],
+            'merge_stats': merge_stats,
+            'version': version
+        }
+        self._expanded = None
+        self._lock = threading.Lock()
+
+    def _expand(self):
+        with self._lock:
+            if self._expanded is None:
+                holdings = []
+                completed_trades = []
+                for result in self._items.values():
+                    holdings.extend(result['holdings'])
+                    completed_trades.extend(result['completed_trades'])
+                self._expanded = {'holdings': holdings, 'completed_trades': completed_trades}
+            return self._expanded
+
+    def __getitem__(self, key):
+        if key in self.LAZY_FIELDS:
+            return self._expand()[key]
+        return self._fields[key]
+
+    def __iter__(self):
+        yield from self.LAZY_FIELDS
+        yield from self._fields
+
+    def __len__(self):
+        return len(self.LAZY_FIELDS) + len(self._fields)
+
+
+class MergeState:
+    """
+    增量合并状态
+
+    每条交易明细归并到的商品键持久化在 trade_record.item_key，
+    每个商品的批次匹配结果及汇总值持久化在 item_lots 表。
+    新导入的明细（item_key 为空）只归并一次，并只重新匹配受影响的商品，
+    仪表板汇总值按受影响商品的变化量增减，而不是对全部交易重新计算。
+    """
+
+    def __init__(self, policy='fifo'):
+        self.policy = policy
+        self.matcher = None
+        self.items = {}  # 商品键 -> 批次匹配结果
+        self.totals = dict.fromkeys(TOTAL_FIELDS, 0.0)
+        self.counts = {'holdings': 0, 'completed_trades': 0}  # 持有批次和成交记录数，与汇总值一样按变化量增减
+        self.version = 0  # 状态变化时递增
+        self.loaded = False
+        self._lock = threading.RLock()
+        self._loaded_event = threading.Event()
+        self._snapshot = self._build_snapshot()
+
+    def load(self):
+        """
+        从数据库恢复合并状态，需要在应用上下文中调用
+
+        已归并商品按首次出现顺序重新加入归并索引。若持久化的匹配结果与明细不一致
+        （策略不同或明细数量不符，例如上次更新中途退出），则对全部商品重新匹配。
+        """
+        with self._lock:
+            first_seen = (
+                db.session.query(TradeRecord.item_key, func.min(TradeRecord.id).label('first_id'))
+                .filter(TradeRecord.item_key.isnot(None))
+                .group_by(TradeRecord.item_key)
+                .order_by('first_id')
+                .all()
+            )
+            item_keys = [item_key for item_key, _ in first_seen]
+            self.matcher = ItemMatcher.for_names(item_keys)
+            for item_key in item_keys:
+                wear_level, standardized_name = split_item_name(item_key)
+                self.matcher.index.add(item_key, wear_level, standardized_name)
+
+            applied_count = db.session.query(func.count(TradeRecord.id)).filter(TradeRecord.item_key.isnot(None)).scalar()
+            rows = {row.item_key: row for row in ItemLots.query.all()}
+            consistent = (
+                all(row.policy == self.policy for row in rows.values())
+                and sum(row.trade_count for row in rows.values()) == applied_count
+            )
+
+            self.items = {}
+            self.totals = dict.fromkeys(TOTAL_FIELDS, 0.0)
+            self.counts = {'holdings': 0, 'completed_trades': 0}
+            if consistent:
+                # 按商品首次出现顺序恢复，与完整重建时的输出顺序一致
+                for item_key in item_keys:
+                    row = rows.get(item_key)
+                    if row is None:
+                        continue
+                    self.items[item_key] = json.loads(row.result)
+                    for field in TOTAL_FIELDS:
+                        self.totals[field] += getattr(row, field)
+                    self._count(self.items[item_key], 1)
+            else:
+                logger.warning("合并状态与交易明细不一致，重新匹配所有商品")
+                ItemLots.query.delete()
+                self._recompute(item_keys)
+                db.session.commit()
+
+            self.loaded = True
+            self._publish()
+            self._loaded_event.set()
+
+    def apply(self, removed_keys=(), policy=None):
+        """
+        应用新导入的交易明细
+
+        Args:
+            removed_keys: 因导出文件改写或删除而失去明细的商品键
+            policy: 批次匹配策略，与当前策略不同时对全部商品重新匹配
+
+        Returns:
+            bool: 状态是否发生变化
+        """
+        with self._lock:
+            if not self.loaded:
+                self.load()
+
+            if policy and policy != self.policy:
+                self.policy = policy
+                self._recompute(list(self.items))
+                db.session.commit()
+                self._publish()
+
+            new_records = (
+                TradeRecord.query.filter(TradeRecord.item_key.is_(None))
+                .order_by(TradeRecord.id)
+                .all()
+            )
+            if not new_records and not removed_keys:
+                return False
+
+            if new_records and len(self.matcher.index) == 0:
+                # 首次归并时按全部名称统计字符频率
+                self.matcher = ItemMatcher.for_names(record.item_name for record in new_records)
+
+            affected_keys = set(removed_keys)
+            assignments = []
+            for record in new_records:
+                item_key = self.matcher.resolve(record.item_name)
+                assignments.append({'id': record.id, 'item_key': item_key})
+                affected_keys.add(item_key)
+            if assignments:
+                db.session.execute(db.update(TradeRecord), assignments)
+
+            self._recompute(affected_keys)
+            db.session.commit()
+            self._publish()
+            logger.info("增量合并：新增明细%s条，重新匹配商品%s个", len(new_records), len(affected_keys))
+            return True
+
+    def _recompute(self, item_keys):
+        """重新匹配指定商品，更新其持久化结果并增减汇总值"""
+        item_keys = list(item_keys)
+        trades_by_key = {item_key: [] for item_key in item_keys}
+        for start in range(0, len(item_keys), QUERY_CHUNK_SIZE):
+            chunk = item_keys[start:start + QUERY_CHUNK_SIZE]
+            records = (
+                TradeRecord.query.filter(TradeRecord.item_key.in_(chunk))
+                .order_by(TradeRecord.id)
+                .all()
+            )
+            for record in records:
+                trades_by_key[record.item_key].append(record.to_trade_dict())
+
+        debug_items = row_sampler(logger)
+        for item_key, trades in trades_by_key.items():
+            old_result = self.items.get(item_key)
+            if old_result is not None:
+                for field, value in item_totals(old_result).items():
+                    self.totals[field] -= value
+                self._count(old_result, -1)
+
+            if not trades:
+                self.items.pop(item_key, None)
+                ItemLots.query.filter_by(item_key=item_key).delete()
+                continue
+
+            result = match_item_lots(item_key, trades, self.policy)
+            totals = item_totals(result)
+            if debug_items:
+                debug_items.debug("重新匹配 %s：明细%d条，持有%d批", item_key, len(trades), len(result['holdings']))
+            for field, value in totals.items():
+                self.totals[field] += value
+            self._count(result, 1)
+            self.items[item_key] = result
+            db.session.merge(ItemLots(
+                item_key=item_key,
+                policy=self.policy,
+                trade_count=len(trades),
+                result=json.dumps(result, ensure_ascii=False),
+                **totals
+            ))
+
+    def _count(self, result, sign):
+        """按单个商品的匹配结果增减持有批次和成交记录数"""
+        for field in self.counts:
+            self.counts[field] += sign * len(result[field])
+
+    def _build_snapshot(self):
+        return LotsSnapshot(
+            dict(self.items),
+            dict(self.totals),
+            dict(self.counts),
+            self.matcher.hit_rates() if self.matcher else {},
+            self.version
+        )
+
+    def _publish(self):
+        """状态变化后生成新的快照，读取方不会看到更新到一半的状态"""
+        self.version += 1
+        self._snapshot = self._build_snapshot()
+
+    def wait_loaded(self, timeout=None):
+        """等待持久化的状态加载完成，返回是否已加载"""
+        return self._loaded_event.wait(timeout)
+
+    def snapshot(self):
+        """
+        返回最近一次发布的持有批次、成交记录和汇总值
+
+        不等待正在进行的更新，更新期间返回更新前的快照。
+
+        Returns:
+            LotsSnapshot: {'holdings', 'completed_trades', 'holdings_count', 'completed_trades_count',
+                           'totals', 'merge_stats', 'version'}
+        """
+        return self._snapshot
@@ -0,0 +1,84 @@
+"""
+数据库结构迁移
+
+已执行的迁移版本保存在SQLite的 user_version 中，启动时按版本顺序执行未执行的迁移。
+新建的数据库由 db.create_all 按模型建表后同样会执行所有迁移，因此每个迁移都需要可以重复执行。
+"""
+import logging
+
+from models import db, assign_trade_keys, TRADE_IDENTITY, BUFF_TRADE_IDENTITY
+
+logger = logging.getLogger(__name__)
+
+
+def add_trade_key(connection):
+    """
+    交易记录按交易标识唯一（批量写入的 ON CONFLICT 依赖该索引）
+
+    为已有记录计算 trade_key，标识相同的记录按ID顺序加序号，所有记录都会保留
+    """
+    columns = {row[1] for row in connection.execute(db.text("PRAGMA table_info(trade)"))}
+    if 'trade_key' not in columns:
+        connection.execute(db.text("ALTER TABLE trade ADD COLUMN trade_key VARCHAR(40)"))
+
+    rows = [dict(row._mapping) for row in connection.execute(db.text(
+        "SELECT id, platform, type, item_name, purchase_date, sale_date FROM trade "
+        "WHERE trade_key IS NULL ORDER BY id"
+    ))]
+    buff_rows = [row for row in rows if row['platform'] == 'BUFF']
+    other_rows = [row for row in rows if row['platform'] != 'BUFF']
+    assign_trade_keys(buff_rows, BUFF_TRADE_IDENTITY)
+    assign_trade_keys(other_rows, TRADE_IDENTITY)
+    if rows:
+        connection.execute(db.text("UPDATE trade SET trade_key = :trade_key WHERE id = :id"),
+                           [{'id': row['id'], 'trade_key': row['trade_key']} for row in rows])
+        logger.info("已为%s条交易记录生成交易标识", len(rows))
+
+    connection.execute(db.text("CREATE UNIQUE INDEX IF NOT EXISTS ux_trade_trade_key ON trade (trade_key)"))
+
+
+def add_trade_indexes(connection):
+    """交易记录按物品名称、平台、类型、买入日期和卖出日期筛选的索引"""
+    for column in ['item_name', 'platform', 'type', 'purchase_date', 'sale_date']:
+        connection.execute(db.text(f"CREATE INDEX IF NOT EXISTS ix_trade_{column} ON trade ({column})"))
+
+
+def drop_trade_indexes(connection):
+    """移除版本2的筛选索引：交易记录在内存中筛选和排序，没有查询使用这些索引，只会增加写入开销"""
+    for column in ['item_name', 'platform', 'type', 'purchase_date', 'sale_date']:
+        connection.execute(db.text(f"DROP INDEX IF EXISTS ix_trade_{column}"))
+
+
+# (版本, 说明, 迁移函数)，只能在末尾追加
+MIGRATIONS = [
+    (1, '交易记录交易标识唯一索引', add_trade_key),
+    (2, '交易记录筛选索引', add_trade_indexes),
+    (3, '移除交易记录筛选索引', drop_trade_indexes),
+]
+
+
+def get_schema_version(connection):
+    return connection.execute(db.text("PRAGMA user_version")).scalar()
+
+
+def run_migrations():
+    """
+    执行未执行的迁移，需要在应用上下文中、db.create_all 之后调用
+
+    Returns:
+        list: 本次执行的迁移版本
+    """
+    with db.engine.connect() as connection:
+        version = get_schema_version(connection)
+
+    applied = []
+    for target, description, migrate in MIGRATIONS:
+        if target <= version:
+            continue
+        # 每个迁移和版本号在同一个事务中提交
+        with db.engine.begin() as connection:
+            migrate(connection)
+            connection.execute(db.text(f"PRAGMA user_version = {int(target)}"))
+        logger.info("数据库迁移到版本%s：%s", target, description)
+        applied.append(target)
+    return applied
@@ -1,13 +1,80 @@
+import hashlib
+import logging
+from collections import Counter
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 db = SQLAlchemy()
 
+# SQLite连接参数：WAL模式下后台导入写入时页面读取不会被阻塞
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',  # WAL模式下只在检查点时同步，断电最多丢失最后提交的事务
+    'cache_size': -32000,  # 页缓存（负数单位为KB）
+    'mmap_size': 268435456,  # 内存映射读取的最大字节数
+}
+
+
+def init_sqlite_pragmas(app, pragmas=None):
+    """
+    为应用的SQLite数据库连接设置 PRAGMA，需要在 db.init_app(app) 之后调用
+
+    Args:
+        app: Flask应用
+        pragmas: PRAGMA名称 -> 值，默认使用 app.config['SQLITE_PRAGMAS']，未配置时使用 SQLITE_PRAGMAS
+    """
+    from sqlalchemy import event
+
+    if pragmas is None:
+        pragmas = app.config.get('SQLITE_PRAGMAS', SQLITE_PRAGMAS)
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+# 交易记录的标识列：CSV导入的每条记录按完整标识区分；BUFF记录按物品汇总，每个物品一条（卖出信息更新到同一条记录）
+TRADE_IDENTITY = ['platform', 'type', 'item_name', 'purchase_date', 'sale_date']
+BUFF_TRADE_IDENTITY = ['platform', 'item_name']
+
+
+def trade_key(*identity):
+    """由交易标识计算唯一键"""
+    text = '\x1f'.join('' if part is None else str(part) for part in identity)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def assign_trade_keys(rows, identity_columns):
+    """
+    为行字典计算 trade_key
+
+    标识完全相同的行按出现顺序加上序号，得到不同的键，批量写入时不会互相覆盖
+
+    Returns:
+        list: 传入的行（已添加 trade_key）
+    """
+    occurrences = Counter()
+    for row in rows:
+        identity = tuple(row[column] for column in identity_columns)
+        row['trade_key'] = trade_key(*identity, occurrences[identity])
+        occurrences[identity] += 1
+    return rows
+
+
 class Trade(db.Model):
     """交易记录模型"""
     __tablename__ = 'trade'
     
     id = db.Column(db.Integer, primary_key=True)
+    trade_key = db.Column(db.String(40), nullable=False)  # 交易标识的哈希（唯一，批量写入时按该键更新已有记录），见 assign_trade_keys
     item_name = db.Column(db.String(100), nullable=False)  # 物品名称
     quantity = db.Column(db.Integer, nullable=False)  # 数量
     unit_price = db.Column(db.Float, nullable=False)  # 单价
@@ -19,6 +86,11 @@ class Trade(db.Model):
     platform = db.Column(db.String(20))  # 平台
     type = db.Column(db.String(10))  # 类型（买入/卖出）
     
+    # 索引变化时需在 migrations.py 中添加对应的迁移，已有数据库不会通过 create_all 补建索引
+    __table_args__ = (
+        db.Index('ux_trade_trade_key', 'trade_key', unique=True),
+    )
+    
     def to_dict(self):
         """转换为字典格式"""
         return {
@@ -32,5 +104,113 @@ class Trade(db.Model):
             'sale_date': self.sale_date.strftime('%Y-%m-%d') if self.sale_date else None,
             'sale_price': self.sale_price,
             'platform': self.platform,
-            'type': self.type
-        } 
\ No newline at end of file
+            'type': self.type,
+            'net_profit': self.net_profit,
+            'profit_ratio': self.profit_ratio
+        }
+
+    @property
+    def net_profit(self):
+        """按现价计算的单件盈亏，没有现价时为 None"""
+        if self.current_price is None:
+            return None
+        return self.current_price - self.unit_price
+
+    @property
+    def profit_ratio(self):
+        """按现价计算的盈亏比例，单价为0时为0"""
+        if self.current_price is None:
+            return None
+        return (self.current_price - self.unit_price) / self.unit_price if self.unit_price > 0 else 0
+
+
+class TradeRecord(db.Model):
+    """平台导出的标准化交易明细（每行对应一笔买入或卖出）"""
+    __tablename__ = 'trade_record'
+    __table_args__ = (
+        db.Index('ix_trade_record_canonical_type', 'canonical_name', 'type'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    source_file = db.Column(db.String(255), nullable=False, index=True)  # 来源文件
+    platform = db.Column(db.String(20), nullable=False, index=True)  # 平台
+    type = db.Column(db.String(10), nullable=False, index=True)  # 类型（buy/sale）
+    item_name = db.Column(db.String(200), nullable=False)  # 原始物品名称
+    canonical_name = db.Column(db.String(200), nullable=False)  # 规范名称
+    item_url = db.Column(db.String(500))  # 物品链接
+    price = db.Column(db.Float, nullable=False)  # 成交价格
+    trade_time = db.Column(db.String(19), index=True)  # 交易时间 YYYY-MM-DD HH:MM:SS
+    item_key = db.Column(db.String(200), index=True)  # 归并后的商品键，尚未归并时为空
+    
+    def to_trade_dict(self):
+        """转换为 /api/data 使用的交易记录格式"""
+        trade = {
+            'item_name': self.item_name,
+            'item_url': self.item_url,
+            'quantity': 1,
+            'unit_price': self.price,
+            'total_price': self.price,
+            'platform': self.platform
+        }
+        if self.type == 'buy':
+            trade['purchase_date'] = self.trade_time
+        else:
+            trade['sale_date'] = self.trade_time
+            trade['sale_price'] = self.price
+        return trade
+
+
+class IngestedFile(db.Model):
+    """已导入的交易导出文件及其指纹"""
+    __tablename__ = 'ingested_file'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    path = db.Column(db.String(255), nullable=False, unique=True)  # 文件路径
+    size = db.Column(db.Integer, nullable=False)  # 文件大小
+    mtime = db.Column(db.Integer, nullable=False)  # 修改时间（纳秒）
+    sha1 = db.Column(db.String(40), nullable=False)  # 内容哈希
+    row_count = db.Column(db.Integer, nullable=False, default=0)  # 导入的记录数
+    ingested_at = db.Column(db.DateTime, default=datetime.now)  # 导入时间
+
+
+
+class ItemLots(db.Model):
+    """单个商品的批次匹配结果（增量合并状态）"""
+    __tablename__ = 'item_lots'
+    
+    item_key = db.Column(db.String(200), primary_key=True)  # 商品键
+    policy = db.Column(db.String(10), nullable=False)  # 批次匹配策略
+    trade_count = db.Column(db.Integer, nullable=False)  # 参与匹配的交易明细数
+    result = db.Column(db.Text, nullable=False)  # 匹配结果（JSON）
+    realized_profit = db.Column(db.Float, nullable=False, default=0.0)  # 已实现盈亏
+    unrealized_profit = db.Column(db.Float, nullable=False, default=0.0)  # 未实现盈亏
+    open_cost = db.Column(db.Float, nullable=False, default=0.0)  # 持有批次成本
+    buff_buy = db.Column(db.Float, nullable=False, default=0.0)  # BUFF持有批次成本
+    buff_sale = db.Column(db.Float, nullable=False, default=0.0)  # BUFF卖出金额
+
+
+# 可由导出文件重新生成的派生表
+DERIVED_MODELS = [TradeRecord, IngestedFile, ItemLots]
+
+
+def rebuild_stale_derived_tables():
+    """
+    派生表结构与模型定义不一致时（如新增了列），删除并重建所有派生表
+    需要在应用上下文中调用，重建后交易明细会在下次同步时重新导入
+    """
+    inspector = db.inspect(db.engine)
+    for model in DERIVED_MODELS:
+        table = model.__table__
+        if not inspector.has_table(table.name):
+            continue
+        existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+        if existing_columns != set(table.columns.keys()):
+            break
+    else:
+        return False
+    
+    logger.warning("派生表结构已变化，重建交易明细相关表")
+    tables = [model.__table__ for model in DERIVED_MODELS]
+    db.metadata.drop_all(db.engine, tables=tables)
+    db.metadata.create_all(db.engine, tables=tables)
+    return True
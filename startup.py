@@ -0,0 +1,85 @@
+import logging
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundIngestion:
+    """
+    后台数据导入
+
+    Web服务启动后立即可以响应请求，导入步骤在后台线程的应用上下文中依次执行。
+    导入完成前，接口返回上次持久化的数据快照，可通过 status() 查询导入进度。
+    """
+
+    def __init__(self):
+        self.state = 'pending'  # pending / running / ready / failed
+        self.step = None
+        self.started_at = None
+        self.finished_at = None
+        self.error = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._thread = None
+
+    @property
+    def ready(self):
+        return self.state == 'ready'
+
+    @property
+    def finished(self):
+        return self._done.is_set()
+
+    def start(self, app, steps):
+        """
+        启动后台导入，重复调用时不会再次启动
+
+        Args:
+            app: Flask应用，各步骤在其应用上下文中执行
+            steps: [(步骤名称, 无参函数)] 按顺序执行，任一步骤出错即停止
+
+        Returns:
+            bool: 本次调用是否启动了导入
+        """
+        with self._lock:
+            if self._thread is not None:
+                return False
+            self.state = 'running'
+            self.started_at = datetime.now()
+            self._thread = threading.Thread(target=self._run, args=(app, steps), name='ingestion', daemon=True)
+            self._thread.start()
+            return True
+
+    def _run(self, app, steps):
+        try:
+            with app.app_context():
+                for name, step in steps:
+                    self.step = name
+                    logger.info("后台导入：%s", name)
+                    step()
+            self.state = 'ready'
+            logger.info("后台导入完成，用时%.2fs", (datetime.now() - self.started_at).total_seconds())
+        except Exception as e:
+            self.state = 'failed'
+            self.error = str(e)
+            logger.exception("后台导入在%s步骤失败", self.step)
+        finally:
+            self.step = None
+            self.finished_at = datetime.now()
+            self._done.set()
+
+    def wait(self, timeout=None):
+        """等待导入结束，返回是否已结束"""
+        return self._done.wait(timeout)
+
+    def status(self):
+        """导入进度，用于就绪检查接口"""
+        return {
+            'ready': self.ready,
+            'state': self.state,
+            'step': self.step,
+            'started_at': self.started_at.isoformat(timespec='seconds') if self.started_at else None,
+            'finished_at': self.finished_at.isoformat(timespec='seconds') if self.finished_at else None,
+            'error': self.error
+        }
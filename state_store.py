@@ -0,0 +1,134 @@
+import os
+import json
+import atexit
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# 状态名称 -> 持久化文件
+STATE_FILES = {
+    'balance': 'data/balance.json',  # 各平台余额
+    'inventory_value': 'data/inventory_value.json',  # BUFF库存价值
+    'total_investment': 'data/custom_total_investment.json',  # 自定义总投入
+}
+
+
+class StateStore:
+    """
+    进程内的状态存储
+
+    余额、库存价值和总投入首次使用时从文件读取，之后保存在内存中，读取时不再访问文件。
+    所有读写在同一把锁内进行，每次修改使版本号加一；修改后由后台线程写入文件（写入临时文件后 os.replace），
+    同一状态的多次修改合并为一次写入，写入的总是最新版本。
+    """
+
+    def __init__(self, files=None):
+        self.files = dict(files or STATE_FILES)
+        self._lock = threading.Lock()
+        self._data = {}
+        self._versions = {name: 0 for name in self.files}
+        self._saved_versions = dict(self._versions)  # 已写入文件的版本
+        self._attempted_versions = dict(self._versions)  # 后台线程已尝试写入的版本，写入失败时等下次修改再重试
+        self._dirty = threading.Condition(self._lock)
+        self._write_lock = threading.Lock()  # 同一时间只有一个线程写文件，旧版本不会覆盖新版本
+        self._writer = None
+        self.version = 0
+
+    def _load(self, name):
+        """读取状态文件（调用方持有锁），文件不存在或无法解析时为空"""
+        if name in self._data:
+            return self._data[name]
+        data = {}
+        path = self.files[name]
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except Exception as e:
+                logger.error("读取%s失败：%s", path, e)
+        self._data[name] = data
+        return data
+
+    def get(self, name):
+        """返回状态的副本"""
+        with self._lock:
+            return dict(self._load(name))
+
+    def snapshot(self):
+        """
+        在同一把锁内读取所有状态
+
+        Returns:
+            dict: 状态名称 -> 状态副本，以及当前版本号 version
+        """
+        with self._lock:
+            result = {name: dict(self._load(name)) for name in self.files}
+            result['version'] = self.version
+            return result
+
+    def set(self, name, data):
+        """替换整个状态，返回新状态的副本"""
+        def replace(current):
+            current.clear()
+            current.update(data)
+        return self.update(name, replace)
+
+    def update(self, name, modify):
+        """
+        在锁内修改状态并安排写入文件
+
+        Args:
+            name: 状态名称
+            modify: modify(状态字典)，直接修改传入的字典
+
+        Returns:
+            dict: 修改后状态的副本
+        """
+        with self._lock:
+            data = self._load(name)
+            modify(data)
+            self.version += 1
+            self._versions[name] = self.version
+            self._start_writer()
+            self._dirty.notify()
+            return dict(data)
+
+    def _start_writer(self):
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._write_loop, name='state-writer', daemon=True)
+            self._writer.start()
+
+    def _write_loop(self):
+        while True:
+            with self._lock:
+                while not any(self._versions[name] > self._attempted_versions[name] for name in self.files):
+                    self._dirty.wait()
+            self.flush()
+
+    def flush(self):
+        """将修改过的状态写入文件"""
+        with self._write_lock:
+            with self._lock:
+                pending = [(name, self._versions[name], json.dumps(self._data[name], ensure_ascii=False))
+                           for name in self.files if self._versions[name] > self._saved_versions[name]]
+                for name, version, _ in pending:
+                    self._attempted_versions[name] = version
+            for name, version, content in pending:
+                path = self.files[name]
+                try:
+                    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+                    temp_path = f'{path}.tmp'
+                    with open(temp_path, 'w', encoding='utf-8') as f:
+                        f.write(content)
+                    os.replace(temp_path, path)
+                except Exception as e:
+                    logger.error("写入%s失败：%s", path, e)
+                    continue
+                with self._lock:
+                    # 写入期间可能有新的修改，只记录已写入的版本
+                    self._saved_versions[name] = version
+
+
+state_store = StateStore()
+atexit.register(state_store.flush)
@@ -4,6 +4,39 @@ let currentSort = {
     direction: 'asc'
 };
 
+// 持有记录和成交记录分页加载，排序和筛选在服务器端进行
+const TRADE_PAGE_SIZE = 50;
+const tradeTables = {
+    holdings: {
+        url: '/api/holdings',
+        pane: 'holdings',
+        bodyId: 'holdingsTableBody',
+        moreId: 'holdingsLoadMore',
+        searchId: 'holdingsSearch',
+        columns: 6,
+        emptyText: '暂无持有记录',
+        renderRow: renderHoldingRow,
+        sort: null,
+        q: '',
+        cursor: null,
+        version: null
+    },
+    completed_trades: {
+        url: '/api/completed_trades',
+        pane: 'completed',
+        bodyId: 'completedTableBody',
+        moreId: 'completedLoadMore',
+        searchId: 'completedSearch',
+        columns: 9,
+        emptyText: '暂无成交记录',
+        renderRow: renderCompletedTradeRow,
+        sort: null,
+        q: '',
+        cursor: null,
+        version: null
+    }
+};
+
 // 页面加载时初始化
 document.addEventListener('DOMContentLoaded', function() {
     // 初始化标签页
@@ -32,7 +65,25 @@ function addEventListeners() {
     document.querySelectorAll('.sortable').forEach(header => {
         header.addEventListener('click', () => {
             const column = header.dataset.sort;
-            sortTable(column);
+            const table = tradeTableOf(header);
+            if (table) {
+                sortTradeTable(table, header);
+            } else {
+                sortTable(column);
+            }
+        });
+    });
+
+    // 持有记录和成交记录：加载更多和按名称筛选
+    Object.entries(tradeTables).forEach(([table, config]) => {
+        document.getElementById(config.moreId).addEventListener('click', () => loadTradePage(table, false));
+        let searchTimer = null;
+        document.getElementById(config.searchId).addEventListener('input', event => {
+            clearTimeout(searchTimer);
+            searchTimer = setTimeout(() => {
+                config.q = event.target.value.trim();
+                loadTradePage(table, true);
+            }, 300);
         });
     });
 
@@ -45,16 +96,21 @@ function addEventListeners() {
     });
 }
 
-// 加载数据
+// 加载数据：先加载汇总数据，再加载两个表格的第一页
 async function loadData() {
     try {
         console.log('开始加载数据...');
-        const response = await fetch('/api/data');
+        const response = await fetch('/api/summary');
         const data = await response.json();
         console.log('获取到的数据:', data);
         
         updateDashboard(data);
-        updateTables(data);
+        await Promise.all(Object.keys(tradeTables).map(table => loadTradePage(table, true)));
+        
+        // 后台导入未完成时显示的是上次保存的数据，导入完成后重新加载
+        if (data.ready === false) {
+            waitForIngestion();
+        }
         
         console.log('数据加载完成');
     } catch (error) {
@@ -62,6 +118,32 @@ async function loadData() {
     }
 }
 
+// 轮询后台导入状态
+let ingestionPolling = null;
+
+function waitForIngestion() {
+    if (ingestionPolling) {
+        return;
+    }
+    showToast('正在后台导入交易记录，当前显示上次保存的数据', 'info');
+    ingestionPolling = setInterval(async () => {
+        try {
+            const response = await fetch('/api/ready');
+            const status = await response.json();
+            if (status.state === 'ready' || status.state === 'failed') {
+                clearInterval(ingestionPolling);
+                ingestionPolling = null;
+                if (status.state === 'failed') {
+                    showToast(`交易记录导入失败：${status.error}`, 'error');
+                }
+                loadData();
+            }
+        } catch (error) {
+            console.error('检查导入状态失败:', error);
+        }
+    }, 2000);
+}
+
 // 更新仪表板数据
 function updateDashboard(data) {
     // 更新统计数据
@@ -84,131 +166,101 @@ function updateDashboard(data) {
     document.getElementById('buffNetProfit').textContent = `¥${data.buff_net_profit.toFixed(2)}`;
 }
 
-// 更新表格
-function updateTables(data) {
-    updateHoldingsTable(data.holdings);
-    updateCompletedTradesTable(data.completed_trades);
-}
+// 加载持有记录或成交记录的一页，reset 为 true 时从第一页重新加载
+async function loadTradePage(table, reset) {
+    const config = tradeTables[table];
+    const params = new URLSearchParams({ limit: TRADE_PAGE_SIZE });
+    if (config.sort) {
+        params.set('sort', config.sort);
+    }
+    if (config.q) {
+        params.set('q', config.q);
+    }
+    if (!reset && config.cursor) {
+        params.set('cursor', config.cursor);
+    }
 
-// 更新持有记录表格
-function updateHoldingsTable(holdings) {
-    const holdingsTableBody = document.getElementById('holdingsTableBody');
-    holdingsTableBody.innerHTML = '';
-    if (holdings && holdings.length > 0) {
-        holdings.forEach(trade => {
-            const row = document.createElement('tr');
-            row.innerHTML = `
-                <td><a href="${trade.item_url || '#'}" target="_blank" class="text-decoration-none">${trade.item_name}</a></td>
-                <td>${trade.quantity}</td>
-                <td>¥${trade.unit_price.toFixed(2)}</td>
-                <td>¥${trade.total_price.toFixed(2)}</td>
-                <td>${trade.purchase_date}</td>
-                <td>${trade.platform}</td>
-            `;
-            holdingsTableBody.appendChild(row);
-        });
-    } else {
-        holdingsTableBody.innerHTML = '<tr><td colspan="6" class="text-center">暂无持有记录</td></tr>';
+    try {
+        const response = await fetch(`${config.url}?${params}`);
+        const page = await response.json();
+        if (!response.ok) {
+            throw new Error(page.error || response.statusText);
+        }
+        // 翻页期间数据已更新时从第一页重新加载
+        if (!reset && page.version !== config.version) {
+            return loadTradePage(table, true);
+        }
+
+        const tbody = document.getElementById(config.bodyId);
+        if (reset) {
+            tbody.innerHTML = '';
+        }
+        page.items.forEach(trade => tbody.appendChild(config.renderRow(trade)));
+        if (page.total === 0) {
+            tbody.innerHTML = `<tr><td colspan="${config.columns}" class="text-center">${config.emptyText}</td></tr>`;
+        }
+
+        config.cursor = page.next_cursor;
+        config.version = page.version;
+        const more = document.getElementById(config.moreId);
+        more.classList.toggle('d-none', !page.next_cursor);
+        more.textContent = `加载更多（已显示${tbody.children.length}/${page.total}条）`;
+    } catch (error) {
+        console.error('加载表格数据失败:', error);
+        showToast(`加载表格数据失败：${error.message}`, 'error');
     }
 }
 
-// 更新成交记录表格
-function updateCompletedTradesTable(completed_trades) {
-    const completedTableBody = document.getElementById('completedTableBody');
-    completedTableBody.innerHTML = '';
+// 持有记录行
+function renderHoldingRow(trade) {
+    const row = document.createElement('tr');
+    row.innerHTML = `
+        <td><a href="${trade.item_url || '#'}" target="_blank" class="text-decoration-none">${trade.item_name}</a></td>
+        <td>${trade.quantity}</td>
+        <td>¥${trade.unit_price.toFixed(2)}</td>
+        <td>¥${trade.total_price.toFixed(2)}</td>
+        <td>${trade.purchase_date}</td>
+        <td>${trade.platform}</td>
+    `;
+    return row;
+}
+
+// 成交记录行：每条成交记录对应一次批次匹配，没有买入批次的卖出记录买入信息为空
+function renderCompletedTradeRow(trade) {
+    const hasBuy = trade.purchase_date !== null && trade.unit_price !== null;
+    const profitClass = !hasBuy ? '' : (trade.profit >= 0 ? 'text-success' : 'text-danger');
     
-    if (completed_trades && completed_trades.length > 0) {
-        // 检查数据结构
-        console.log('检查第一条记录的数据结构:', completed_trades[0]);
-        
-        // 使用Map存储买入记录，key为物品名称
-        const buyMap = new Map();
-        
-        // 每条记录都作为买入记录处理
-        completed_trades.forEach(trade => {
-            const itemName = trade.item_name;
-            if (!buyMap.has(itemName)) {
-                buyMap.set(itemName, []);
-            }
-            // 存储买入信息，计算单个物品的价格
-            buyMap.get(itemName).push({
-                item_name: trade.item_name,
-                unit_price: trade.total_price / trade.quantity, // 计算真实的单价
-                total_price: trade.total_price,
-                purchase_date: trade.purchase_date,
-                quantity: trade.quantity
-            });
-        });
-        
-        console.log('买入记录Map:', Object.fromEntries(buyMap));
-        
-        // 处理卖出记录
-        const processedItems = new Map();
-        
-        // 只处理有sale_date的记录作为卖出记录
-        completed_trades.filter(trade => trade.sale_date).forEach(trade => {
-            const itemName = trade.item_name;
-            
-            // 判断是否为可批量交易的物品
-            const isBulkItem = trade.item_name.includes('印花') || 
-                             trade.item_name.includes('武器箱') || 
-                             trade.item_name.includes('封装的涂鸦');
-            
-            if (processedItems.has(itemName)) {
-                if (isBulkItem) {
-                    const existingItem = processedItems.get(itemName);
-                    existingItem.quantity += trade.quantity;
-                    existingItem.sale_price += trade.sale_price;
-                    if (existingItem.total_price !== '-') {
-                        existingItem.total_price += trade.total_price;
-                    }
-                }
-                return;
-            }
-            
-            // 查找对应的买入记录
-            const matchingBuyRecords = buyMap.get(itemName) || [];
-            console.log(`查找 ${itemName} 的买入记录:`, matchingBuyRecords);
-            
-            // 使用相同记录的买入信息
-            const buyRecord = matchingBuyRecords.find(record => 
-                record.purchase_date === trade.purchase_date
-            ) || matchingBuyRecords[0];
-            
-            const quantity = isBulkItem ? trade.quantity : 1;
-            
-            processedItems.set(itemName, {
-                ...trade,
-                quantity: quantity,
-                sale_price: trade.sale_price,
-                unit_price: buyRecord ? buyRecord.unit_price : '-',
-                total_price: buyRecord ? buyRecord.unit_price * quantity : '-', // 根据数量计算总价
-                purchase_date: buyRecord ? buyRecord.purchase_date : '-'
-            });
-        });
-        
-        // 显示处理后的物品
-        processedItems.forEach(trade => {
-            const profit = trade.total_price !== '-' ? trade.sale_price - trade.total_price : '-';
-            const profitClass = profit === '-' ? '' : (profit >= 0 ? 'text-success' : 'text-danger');
-            
-            const row = document.createElement('tr');
-            row.innerHTML = `
-                <td><a href="${trade.item_url || '#'}" target="_blank" class="text-decoration-none">${trade.item_name}</a></td>
-                <td>${trade.quantity}</td>
-                <td>${trade.unit_price === '-' ? '-' : `¥${trade.unit_price.toFixed(2)}`}</td>
-                <td>${trade.total_price === '-' ? '-' : `¥${trade.total_price.toFixed(2)}`}</td>
-                <td>¥${trade.sale_price.toFixed(2)}</td>
-                <td class="${profitClass}">${profit === '-' ? '-' : `¥${profit.toFixed(2)}`}</td>
-                <td>${trade.purchase_date}</td>
-                <td>${trade.sale_date}</td>
-                <td>${trade.platform}</td>
-            `;
-            completedTableBody.appendChild(row);
-        });
-    } else {
-        completedTableBody.innerHTML = '<tr><td colspan="9" class="text-center">暂无成交记录</td></tr>';
-    }
+    const row = document.createElement('tr');
+    row.innerHTML = `
+        <td><a href="${trade.item_url || '#'}" target="_blank" class="text-decoration-none">${trade.item_name}</a></td>
+        <td>${trade.quantity}</td>
+        <td>${hasBuy ? `¥${trade.unit_price.toFixed(2)}` : '-'}</td>
+        <td>${hasBuy ? `¥${trade.total_price.toFixed(2)}` : '-'}</td>
+        <td>¥${trade.sale_price.toFixed(2)}</td>
+        <td class="${profitClass}">${hasBuy ? `¥${trade.profit.toFixed(2)}` : '-'}</td>
+        <td>${hasBuy ? trade.purchase_date : '-'}</td>
+        <td>${trade.sale_date}</td>
+        <td>${trade.platform}</td>
+    `;
+    return row;
+}
+
+// 表头所在的分页表格，Steam库存表格返回 null
+function tradeTableOf(header) {
+    const pane = header.closest('.tab-pane');
+    const entry = Object.entries(tradeTables).find(([, config]) => pane && pane.id === config.pane);
+    return entry ? entry[0] : null;
+}
+
+// 分页表格排序：由服务器排序后从第一页重新加载
+function sortTradeTable(table, header) {
+    const isAsc = header.classList.contains('asc');
+    header.closest('tr').querySelectorAll('.sortable').forEach(h => {
+        h.classList.remove('asc', 'desc');
+    });
+    header.classList.add(isAsc ? 'desc' : 'asc');
+    tradeTables[table].sort = `${isAsc ? '-' : ''}${header.dataset.sort}`;
+    loadTradePage(table, true);
 }
 
 // 表格排序
@@ -272,6 +324,38 @@ function getColumnIndex(column) {
     return columnMap[column] || 1;
 }
 
+// 提交后台任务并等待完成，返回任务结果
+async function runJob(url) {
+    const response = await fetch(url, { method: 'POST' });
+    const submitted = await response.json();
+    if (!response.ok) {
+        throw new Error(submitted.error || '提交任务失败');
+    }
+    if (submitted.joined) {
+        console.log(`已有相同任务在执行，等待任务 ${submitted.job_id} 完成`);
+    }
+    return waitForJob(submitted.job_id);
+}
+
+// 轮询后台任务状态直到结束
+async function waitForJob(jobId, interval = 1000) {
+    while (true) {
+        const response = await fetch(`/api/jobs/${jobId}`);
+        const job = await response.json();
+        if (!response.ok) {
+            throw new Error(job.error || '查询任务失败');
+        }
+        if (job.state === 'succeeded') {
+            return job.result;
+        }
+        if (job.state === 'failed') {
+            throw new Error(job.error || '任务失败');
+        }
+        console.log(`任务 ${job.name}: ${job.message || job.state} (${Math.round(job.progress * 100)}%)`);
+        await new Promise(resolve => setTimeout(resolve, interval));
+    }
+}
+
 // 更新余额
 async function updateBalance(platform, button) {
     const icon = button.querySelector('i');
@@ -280,17 +364,9 @@ async function updateBalance(platform, button) {
     
     try {
         console.log(`开始更新${platform}余额...`);
-        const response = await fetch(`/api/update_balance?platform=${platform}`, {
-            method: 'POST'
-        });
-        
-        const data = await response.json();
+        const data = await runJob(`/api/update_balance?platform=${platform}`);
         console.log('收到服务器响应数据:', data);
         
-        if (!response.ok) {
-            throw new Error(data.error || '更新失败');
-        }
-        
         // 检查当前平台的余额状态
         const platformMap = {
             'buff': 'BUFF',
@@ -497,25 +573,13 @@ function cancelEdit(elementId) {
 // 更新库存价值
 async function updateInventoryValue() {
     try {
-        const response = await fetch('/api/update_inventory_value', {
-            method: 'POST'
-        });
-        
-        if (!response.ok) {
-            throw new Error('更新失败');
-        }
-        
-        const data = await response.json();
+        const data = await runJob('/api/update_inventory_value');
         
-        if (data.success) {
-            // 更新显示
-            document.getElementById('currentValue').textContent = `¥${data.inventory_value.toFixed(2)}`;
-            // 重新加载数据以更新其他相关数值
-            loadData();
-            showToast('库存价值更新成功', 'success');
-        } else {
-            throw new Error(data.error || '更新失败');
-        }
+        // 更新显示
+        document.getElementById('currentValue').textContent = `¥${data.inventory_value.toFixed(2)}`;
+        // 重新加载数据以更新其他相关数值
+        loadData();
+        showToast('库存价值更新成功', 'success');
     } catch (error) {
         console.error('更新库存价值失败:', error);
         showToast('更新失败: ' + error.message, 'error');
@@ -525,15 +589,7 @@ async function updateInventoryValue() {
 // 更新总余额
 async function updateTotalBalance() {
     try {
-        const response = await fetch('/api/update_balance?platform=all', {
-            method: 'POST'
-        });
-        
-        if (!response.ok) {
-            throw new Error('更新失败');
-        }
-        
-        const data = await response.json();
+        const data = await runJob('/api/update_balance?platform=all');
         
         // 更新显示的余额
         updateBalanceDisplay(data);
@@ -541,7 +597,13 @@ async function updateTotalBalance() {
         // 重新加载数据以更新其他相关数值
         loadData();
         
-        showToast('总余额更新成功', 'success');
+        const platformNames = { 'buff': 'BUFF', 'youpin': '悠悠有品', 'igxe': 'IGXE', 'c5': 'C5' };
+        const skipped = (data.skipped || []).map(name => platformNames[name] || name);
+        if (skipped.length > 0) {
+            showToast(`总余额更新完成，${skipped.join('、')}正在单独更新，本次跳过`, 'success');
+        } else {
+            showToast('总余额更新成功', 'success');
+        }
     } catch (error) {
         console.error('更新总余额失败:', error);
         showToast('更新失败: ' + error.message, 'error');
@@ -553,10 +615,13 @@ function loadSteamInventory() {
     fetch('/api/steam_inventory')
         .then(response => response.json())
         .then(data => {
+            if (data.items === undefined) {
+                throw new Error(data.error);
+            }
             const tableBody = document.getElementById('steamInventoryTableBody');
             tableBody.innerHTML = '';
             
-            data.forEach(item => {
+            data.items.forEach(item => {
                 const row = document.createElement('tr');
                 row.innerHTML = `
                     <td>${item.item_name}</td>
@@ -564,9 +629,33 @@ function loadSteamInventory() {
                 `;
                 tableBody.appendChild(row);
             });
+
+            updateSteamInventoryStatus(data);
         })
         .catch(error => {
             console.error('加载Steam库存失败:', error);
             alert('加载Steam库存失败，请检查控制台获取详细信息。');
         });
-} 
\ No newline at end of file
+}
+
+// 显示库存的更新时间和后台刷新状态，刷新进行中时稍后重新加载
+let steamInventoryReload = null;
+
+function updateSteamInventoryStatus(status) {
+    const element = document.getElementById('steamInventoryStatus');
+    const lastRefresh = status.last_refresh_at ? new Date(status.last_refresh_at).toLocaleString() : '从未更新';
+    let text = `库存更新时间: ${lastRefresh}`;
+    if (status.refreshing) {
+        text += '（正在后台刷新）';
+    }
+    if (status.error) {
+        const attempt = status.last_attempt_at ? new Date(status.last_attempt_at).toLocaleString() : '';
+        text += `，${attempt} 刷新失败: ${status.error}`;
+    }
+    element.textContent = text;
+    element.classList.toggle('text-danger', Boolean(status.error));
+    element.classList.toggle('text-muted', !status.error);
+
+    clearTimeout(steamInventoryReload);
+    steamInventoryReload = status.refreshing ? setTimeout(loadSteamInventory, 3000) : null;
+}
@@ -0,0 +1,74 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def build_summary(lots, state):
+    """
+    计算仪表板的汇总数据（不包括持有记录和成交记录）
+
+    Args:
+        lots: MergeState.snapshot() 返回的批次匹配快照
+        state: state_store.snapshot() 返回的余额、库存价值和自定义总投入
+
+    Returns:
+        dict: /api/summary 返回的汇总值
+    """
+    totals = lots['totals']
+
+    custom_total_investment = state['total_investment'].get('total_investment') or 0
+    inventory_value = state['inventory_value'].get('value') or 0
+    balance_data = state['balance']
+    
+    # 计算总投入（使用自定义总投入或交易记录中的总投入）
+    total_investment = custom_total_investment if custom_total_investment > 0 else totals['open_cost']
+    logger.debug("计算得到的总投入：%s", total_investment)
+    
+    # 计算总价值（账户总余额 + 库存价值）
+    # 确保所有余额都是有效的数字
+    valid_balances = [float(balance) for balance in [
+        balance_data.get('buff_balance', 0.0),
+        balance_data.get('youpin_balance', 0.0),
+        balance_data.get('igxe_balance', 0.0),
+        balance_data.get('c5_balance', 0.0)
+    ] if balance is not None]
+    
+    total_balance = sum(valid_balances)
+    total_value = total_balance * 0.99 + float(inventory_value) * 0.965
+    logger.debug("计算得到的总价值：%s", total_value)
+    
+    # 计算总利润
+    total_profit = total_value - total_investment
+    logger.debug("计算得到的总利润：%s", total_profit)
+    
+    # 计算利润率
+    profit_ratio = (total_profit / total_investment * 100) if total_investment > 0 else 0
+    logger.debug("计算得到的利润率：%s%%", profit_ratio)
+    
+    # 计算BUFF交易统计
+    buff_total_buy = totals['buff_buy']
+    buff_total_sale = totals['buff_sale']
+    buff_net_profit = buff_total_sale - buff_total_buy
+    logger.debug("BUFF交易统计 - 总买入：%s，总卖出：%s，净收益：%s", buff_total_buy, buff_total_sale, buff_net_profit)
+    
+    return {
+        'total_investment': round(total_investment, 2),
+        'inventory_value': round(inventory_value, 2),
+        'total_value': round(total_value, 2),
+        'total_profit': round(total_profit, 2),
+        'profit_ratio': round(profit_ratio, 2),
+        'buff_balance': round(float(balance_data.get('buff_balance', 0.0) or 0.0), 2),
+        'youpin_balance': round(float(balance_data.get('youpin_balance', 0.0) or 0.0), 2),
+        'igxe_balance': round(float(balance_data.get('igxe_balance', 0.0) or 0.0), 2),
+        'c5_balance': round(float(balance_data.get('c5_balance', 0.0) or 0.0), 2),
+        'total_balance': round(total_balance, 2),
+        'buff_total_buy': round(buff_total_buy, 2),
+        'buff_total_sale': round(buff_total_sale, 2),
+        'buff_net_profit': round(buff_net_profit, 2),
+        'realized_profit': round(totals['realized_profit'], 2),
+        'unrealized_profit': round(totals['unrealized_profit'], 2),
+        'holdings_count': lots['holdings_count'],
+        'completed_trades_count': lots['completed_trades_count'],
+        'merge_stats': lots['merge_stats'],
+        'version': lots['version']
+    }
@@ -0,0 +1,7 @@
+import os
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in [REPO_DIR, os.path.join(REPO_DIR, 'benchmarks')]:
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,106 @@
+import json
+
+import pytest
+
+import balances
+from http_scraper import HttpScraper, HttpScrapeError
+from platform_stub import LOGIN_COOKIES, start_server, write_cookie_files
+from state_store import StateStore
+
+# 与 platform_stub.DEFAULT_VALUES 不同，确认解析出的是服务器返回的数值
+VALUES = {
+    ('buff', 'balance'): 12.34,
+    ('buff', 'inventory_value'): 5678.9,
+    ('igxe', 'balance'): 1001.5,
+    ('youpin', 'balance'): 42.0,
+}
+
+
+@pytest.fixture
+def base_url():
+    server = start_server(values=VALUES)
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def logged_in(tmp_path):
+    return write_cookie_files(str(tmp_path))
+
+
+@pytest.fixture
+def logged_out(tmp_path):
+    """只有无关cookie的cookies文件，平台返回未登录响应"""
+    path = tmp_path / 'expired_cookies.json'
+    path.write_text(json.dumps([{'name': 'other', 'value': 'stub'}]))
+    return {platform: str(path) for platform in LOGIN_COOKIES}
+
+
+@pytest.fixture
+def balance_state(tmp_path, monkeypatch):
+    """余额写入临时文件，不影响 data/balance.json"""
+    store = StateStore({'balance': str(tmp_path / 'balance.json')})
+    monkeypatch.setattr(balances, 'state_store', store)
+    return store
+
+
+def test_parses_each_platform(base_url, logged_in):
+    scraper = HttpScraper(base_url, logged_in)
+    try:
+        assert scraper.get_buff_balance() == pytest.approx(12.34)
+        assert scraper.get_igxe_balance() == pytest.approx(1001.5)
+        assert scraper.get_youpin_balance() == pytest.approx(42.0)
+        assert scraper.get_inventory_value() == pytest.approx(5678.9)
+    finally:
+        scraper.close()
+
+
+@pytest.mark.parametrize('platform', sorted(LOGIN_COOKIES))
+def test_missing_login_cookie_raises(base_url, logged_out, platform):
+    scraper = HttpScraper(base_url, logged_out)
+    try:
+        with pytest.raises(HttpScrapeError):
+            scraper.get_balance(platform)
+    finally:
+        scraper.close()
+
+
+def test_missing_cookie_file_raises(base_url, tmp_path):
+    scraper = HttpScraper(base_url, {'buff': str(tmp_path / 'missing.json')})
+    with pytest.raises(HttpScrapeError):
+        scraper.get_buff_balance()
+
+
+def test_refresh_balances_falls_back_to_browser(base_url, logged_out, balance_state, monkeypatch):
+    browser_calls = []
+
+    def fetch_browser_balance(platform, sessions):
+        browser_calls.append(platform)
+        return {'buff': 77.7, 'igxe': 88.8}[platform]
+
+    monkeypatch.setattr(balances, 'http_scraper', HttpScraper(base_url, logged_out))
+    monkeypatch.setattr(balances, 'fetch_browser_balance', fetch_browser_balance)
+
+    result = balances.refresh_balances(['buff', 'igxe'], use_http=True)
+
+    assert sorted(browser_calls) == ['buff', 'igxe']
+    assert result['buff_balance'] == pytest.approx(77.7)
+    assert result['igxe_balance'] == pytest.approx(88.8)
+    assert result['update_status']['buff_balance'] and result['update_status']['igxe_balance']
+    assert result['errors'] == {}
+
+
+def test_refresh_balances_uses_http_when_logged_in(base_url, logged_in, balance_state, monkeypatch):
+    def fetch_browser_balance(platform, sessions):
+        raise AssertionError(f'{platform} 不应使用浏览器')
+
+    monkeypatch.setattr(balances, 'http_scraper', HttpScraper(base_url, logged_in))
+    monkeypatch.setattr(balances, 'fetch_browser_balance', fetch_browser_balance)
+
+    result = balances.refresh_balances(['buff', 'igxe', 'youpin'], use_http=True)
+
+    assert result['buff_balance'] == pytest.approx(12.34)
+    assert result['igxe_balance'] == pytest.approx(1001.5)
+    assert result['youpin_balance'] == pytest.approx(42.0)
+    assert result['errors'] == {}
@@ -0,0 +1,151 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+# 各表可排序的字段
+SORT_FIELDS = {
+    'holdings': ['item_name', 'quantity', 'unit_price', 'total_price', 'purchase_date', 'platform'],
+    'completed_trades': ['item_name', 'quantity', 'unit_price', 'total_price', 'sale_price', 'profit',
+                         'purchase_date', 'sale_date', 'platform'],
+}
+
+# 默认排序（字段前加 - 表示降序）：最近的记录在前
+DEFAULT_SORT = {'holdings': '-purchase_date', 'completed_trades': '-sale_date'}
+
+# date_from / date_to 筛选使用的日期字段
+DATE_FIELDS = {'holdings': 'purchase_date', 'completed_trades': 'sale_date'}
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+
+class PageQueryError(ValueError):
+    """分页查询参数无效"""
+
+
+def parse_page_args(table, args):
+    """
+    解析分页查询参数
+
+    Args:
+        table: holdings 或 completed_trades
+        args: 查询参数（request.args）
+            sort: 排序字段，前加 - 表示降序
+            limit: 每页行数
+            cursor: 上一页返回的 next_cursor
+            q: 饰品名称包含的文字
+            platform: 平台（多平台的记录包含该平台即可）
+            date_from / date_to: 日期范围（YYYY-MM-DD，包含两端）
+
+    Returns:
+        tuple: (排序, 筛选条件, 每页行数, 起始位置)
+
+    Raises:
+        PageQueryError: 参数无效
+    """
+    sort = args.get('sort') or DEFAULT_SORT[table]
+    if sort.lstrip('-') not in SORT_FIELDS[table]:
+        raise PageQueryError(f"不支持的排序字段: {sort}")
+    try:
+        limit = int(args.get('limit', DEFAULT_LIMIT))
+        offset = int(args.get('cursor') or 0)
+    except ValueError:
+        raise PageQueryError("limit 和 cursor 必须是整数")
+    if not 1 <= limit <= MAX_LIMIT or offset < 0:
+        raise PageQueryError(f"limit 需在1到{MAX_LIMIT}之间，cursor 不能为负数")
+    filters = tuple((name, args.get(name)) for name in ['q', 'platform'] if args.get(name))
+    for name in ['date_from', 'date_to']:
+        value = args.get(name)
+        if not value:
+            continue
+        try:
+            # 统一为 YYYY-MM-DD，与记录日期的前10个字符比较
+            value = datetime.strptime(value, '%Y-%m-%d').strftime('%Y-%m-%d')
+        except ValueError:
+            raise PageQueryError(f"{name} 必须是 YYYY-MM-DD 格式的日期: {value}")
+        filters += ((name, value),)
+    return sort, filters, limit, offset
+
+
+def matches(row, table, filters):
+    """行是否满足所有筛选条件"""
+    date = (row[DATE_FIELDS[table]] or '')[:10]
+    for name, value in filters:
+        if name == 'q' and value.lower() not in row['item_name'].lower():
+            return False
+        if name == 'platform' and value not in (row['platform'] or '').split('/'):
+            return False
+        if name == 'date_from' and (not date or date < value):
+            return False
+        if name == 'date_to' and (not date or date > value):
+            return False
+    return True
+
+
+def sort_rows(rows, sort):
+    """按字段排序，空值总是排在最后，相同值按饰品名称排序"""
+    field = sort.lstrip('-')
+    descending = sort.startswith('-')
+    present = [row for row in rows if row[field] is not None]
+    missing = [row for row in rows if row[field] is None]
+    present.sort(key=lambda row: row['item_name'])
+    present.sort(key=lambda row: row[field], reverse=descending)
+    return present + missing
+
+
+class TradePages:
+    """
+    持有记录和成交记录的分页查询
+
+    行来自 MergeState 的快照，每种排序和筛选条件的结果按快照版本缓存，
+    同一版本下翻页只需切片；快照更新后缓存失效，下次查询时重新排序。
+    """
+
+    def __init__(self, cache_size=32):
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._version = None
+        self._views = OrderedDict()
+
+    def view(self, snapshot, table, sort, filters):
+        """返回排序和筛选后的全部行（缓存）"""
+        key = (table, sort, filters)
+        with self._lock:
+            if self._version != snapshot['version']:
+                self._version = snapshot['version']
+                self._views.clear()
+            rows = self._views.get(key)
+            if rows is not None:
+                self._views.move_to_end(key)
+                return rows
+
+        rows = [row for row in snapshot[table] if matches(row, table, filters)] if filters else snapshot[table]
+        rows = sort_rows(rows, sort)
+        with self._lock:
+            if self._version == snapshot['version']:
+                self._views[key] = rows
+                while len(self._views) > self.cache_size:
+                    self._views.popitem(last=False)
+        return rows
+
+    def page(self, snapshot, table, args):
+        """
+        查询一页数据
+
+        Returns:
+            dict: items 当前页的行，total 筛选后的总行数，next_cursor 下一页的 cursor（没有下一页时为 None），
+                  version 快照版本（版本变化后应从第一页重新加载）
+
+        Raises:
+            PageQueryError: 参数无效
+        """
+        sort, filters, limit, offset = parse_page_args(table, args)
+        rows = self.view(snapshot, table, sort, filters)
+        end = offset + limit
+        return {
+            'items': rows[offset:end],
+            'total': len(rows),
+            'next_cursor': str(end) if end < len(rows) else None,
+            'sort': sort,
+            'version': snapshot['version']
+        }